@@ -0,0 +1,123 @@
+"""
+Production serving profile for the dashboard.
+
+Usage (from FinalProjectClean/):
+
+    gunicorn -c gunicorn.conf.py --chdir src app:server
+
+The app, its data and the layout figures are built once in the master and
+inherited by the workers through fork. Python's reference counting writes to
+every object it touches, which would copy those shared pages into each
+worker, so the master freezes the heap (gc.freeze) right before forking.
+Workers log their unique (USS) and proportional (PSS) memory so the sharing
+can be checked, and are recycled when their unique memory grows past a
+ceiling.
+
+Environment variables:
+    WEB_CONCURRENCY      number of workers (default: CPU count)
+    WEB_THREADS          threads per worker (default: 2, 4 on 4+ CPUs)
+    WORKER_MAX_USS_MB    recycle a worker above this unique memory (default: 512)
+    MEMORY_CHECK_EVERY   requests between memory checks (default: 50)
+    SPACE_DATA_REFRESH_SECONDS  data refresh period used inside workers
+"""
+import gc
+import os
+
+cpus = os.cpu_count() or 1
+
+bind = "0.0.0.0:" + os.environ.get("PORT", "8000")
+preload_app = True
+workers = int(os.environ.get("WEB_CONCURRENCY", cpus))
+threads = int(os.environ.get("WEB_THREADS", 4 if cpus >= 4 else 2))
+worker_class = "gthread"
+timeout = 120
+
+# Backstop in case memory checks are not available on this platform
+max_requests = 5000
+max_requests_jitter = 500
+
+max_uss_mb = float(os.environ.get("WORKER_MAX_USS_MB", 512))
+memory_check_every = int(os.environ.get("MEMORY_CHECK_EVERY", 50))
+
+# The data watcher thread must only run inside workers: a thread in the master
+# would not survive fork and could leave its lock held in the children.
+refresh_seconds = float(os.environ.get("SPACE_DATA_REFRESH_SECONDS", "30"))
+os.environ["SPACE_DATA_REFRESH_SECONDS"] = "0"
+
+
+def memory_info(pid="self"):
+    """
+    Read unique and shared memory of a process from /proc (Linux only).
+
+    Parameters:
+    pid (int or str): Process id, "self" for the current process.
+
+    Returns:
+    dict: rss, pss, uss and shared sizes in MB, or None if unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return None
+    uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": uss,
+        "shared": fields.get("Rss", 0) - uss,
+    }
+
+
+def format_memory(info):
+    return "rss={rss:.0f}MB pss={pss:.0f}MB uss={uss:.0f}MB shared={shared:.0f}MB".format(**info)
+
+
+def when_ready(server):
+    # Build the layout (figures, wordcloud, model) before any worker exists
+    import app
+
+    app.serve_layout()
+    info = memory_info()
+    if info:
+        server.log.info("Master preloaded app: %s", format_memory(info))
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the collector's reach so that
+    # collections in the workers never touch (and copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    worker.requests_served = 0
+    if refresh_seconds > 0:
+        import app
+
+        app.store.start_watching(refresh_seconds)
+
+
+def post_worker_init(worker):
+    info = memory_info()
+    if info:
+        worker.log.info("Worker %s started: %s", worker.pid, format_memory(info))
+
+
+def post_request(worker, req, environ, resp):
+    worker.requests_served += 1
+    if worker.requests_served % memory_check_every:
+        return
+    info = memory_info()
+    if info is None:
+        return
+    worker.log.info("Worker %s after %s requests: %s", worker.pid, worker.requests_served, format_memory(info))
+    if info["uss"] > max_uss_mb:
+        worker.log.warning(
+            "Worker %s unique memory %.0fMB above %.0fMB, recycling", worker.pid, info["uss"], max_uss_mb
+        )
+        # Finish the current request, then exit; the arbiter starts a fresh fork
+        worker.alive = False
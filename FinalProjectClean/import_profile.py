@@ -0,0 +1,120 @@
+"""
+Import-time profile of the dashboard modules.
+
+Runs `python -X importtime` on the app's modules in a fresh interpreter and
+summarizes the slowest imports, grouped by top-level package. Used as a
+startup benchmark: save a baseline once, then compare after each change.
+
+    python import_profile.py                          # report
+    python import_profile.py --save import_baseline.json
+    python import_profile.py --compare import_baseline.json
+
+import_baseline.json is the tracked baseline of the default modules; save it
+again when a change is meant to move the numbers.
+
+By default it imports the modules a worker needs without building the data
+(`figures`, `data_processing`, `layout`, `callbacks`, `data_refresh`). Pass
+`--modules app` to include the full startup.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+DEFAULT_MODULES = ["figures", "data_processing", "layout", "callbacks", "data_refresh"]
+# Packages the app is expected to load lazily; reported if they show up
+LAZY_PACKAGES = ["xgboost", "sklearn", "matplotlib", "wordcloud"]
+
+
+def profile_imports(modules):
+    """
+    Import `modules` in a new interpreter with -X importtime.
+
+    Parameters:
+    modules (list): Module names importable from src/.
+
+    Returns:
+    list: (module, self_us, cumulative_us, depth) for every imported module.
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SRC,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        # Last line of the traceback, or the exit code when there is none
+        lines = result.stderr.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"Import failed with exit code {result.returncode}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def summarize(rows, top=15):
+    """
+    Summarize an import profile.
+
+    Parameters:
+    rows (list): Output of `profile_imports`.
+    top (int): Number of packages to list.
+
+    Returns:
+    dict: total_ms, per-package self time in ms and lazily-loaded packages
+    that were imported anyway.
+    """
+    packages = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        packages[name.split(".")[0]] += self_us
+    total_us = sum(self_us for _, self_us, _, _ in rows)
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "packages_ms": {name: round(us / 1000, 1) for name, us in ranked},
+        "eager_heavy_imports": [name for name in LAZY_PACKAGES if name in packages],
+    }
+
+
+def print_report(summary, baseline=None):
+    print(f"Total import time: {summary['total_ms']:.1f} ms", end="")
+    if baseline:
+        print(f" (baseline {baseline['total_ms']:.1f} ms, {summary['total_ms'] - baseline['total_ms']:+.1f} ms)")
+    else:
+        print()
+    for name, ms in summary["packages_ms"].items():
+        previous = baseline["packages_ms"].get(name) if baseline else None
+        delta = f"  ({ms - previous:+.1f})" if previous is not None else ""
+        print(f"  {name:<24} {ms:8.1f} ms{delta}")
+    if summary["eager_heavy_imports"]:
+        print("Heavy packages imported at startup: " + ", ".join(summary["eager_heavy_imports"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=5, help="keep the fastest of N runs")
+    parser.add_argument("--save", help="write the summary to this JSON file")
+    parser.add_argument("--compare", help="compare against a saved JSON summary")
+    args = parser.parse_args()
+
+    summaries = [summarize(profile_imports(args.modules)) for _ in range(args.runs)]
+    summary = min(summaries, key=lambda item: item["total_ms"])
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(summary, baseline)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(summary, f, indent=2)
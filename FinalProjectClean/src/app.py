@@ -1,20 +1,67 @@
+import os
 from dash import Dash
 import dash_bootstrap_components as dbc
-from layout import create_layout
-from data_processing import load_and_preprocess_data_astronauts, load_and_preprocess_data_missions, generate_wordcloud
+from layout import create_layout, create_failure_explanation_card, spacex_image
+from data_refresh import DatasetStore
+from startup import build_startup_pipeline
 from callbacks import  astronaut_callbacks, mission_time_series_callback, mission_3d_scatter_callback
 
 app = Dash(__name__, external_stylesheets=[dbc.themes.SUPERHERO, dbc.icons.FONT_AWESOME])
 server = app.server
 
-df_space_missions, missions_per_country, grouped_df = load_and_preprocess_data_missions("assets/space_missions.csv")
-df_astronauts, major_counts, state_counts = load_and_preprocess_data_astronauts("assets/astronauts.csv")
-wordcloud_image = generate_wordcloud(df_astronauts)
-app.layout = create_layout(df_astronauts, df_space_missions, state_counts, major_counts, wordcloud_image, missions_per_country, grouped_df)
+# Optional append-only delta files, e.g. "missions:assets/missions_delta.csv;astronauts:assets/astronauts_delta.csv"
+delta_paths = [
+    tuple(entry.split(":", 1))
+    for entry in os.environ.get("SPACE_DATA_DELTAS", "").split(";")
+    if entry
+]
+store = DatasetStore("assets/space_missions.csv", "assets/astronauts.csv", delta_paths, load=False)
 
-astronaut_callbacks(app, df_astronauts)
-mission_time_series_callback(app, df_space_missions)
-mission_3d_scatter_callback(app, df_space_missions)
+# Independent loaders, the word cloud, the figures and the model run concurrently
+startup = build_startup_pipeline(store)
+startup_results = startup.run()
+if os.environ.get("SPACE_STARTUP_PROFILE"):
+    # Per-step timings of the startup, e.g. SPACE_STARTUP_PROFILE=1 python app.py
+    print(startup.waterfall())
+
+# Built from Space_Corrected.csv only, so data refreshes reuse it
+failure_explanation_card = create_failure_explanation_card(
+    spacex_image, startup_results["df_ms"], startup_results
+)
+
+_layout_cache = {}
+
+
+def serve_layout():
+    # Rebuilt once per dataset version, then reused for every page load
+    data = store.current()
+    layout = _layout_cache.get(data.version)
+    if layout is None:
+        layout = create_layout(
+            data.df_astronauts,
+            data.df_space_missions,
+            data.state_counts,
+            data.major_counts,
+            data.wordcloud_image,
+            data.missions_per_country,
+            data.grouped_df,
+            failure_explanation_card,
+        )
+        _layout_cache.clear()
+        _layout_cache[data.version] = layout
+    return layout
+
+
+app.layout = serve_layout
+
+astronaut_callbacks(app, store)
+mission_time_series_callback(app, store)
+mission_3d_scatter_callback(app, store)
+
+# Seconds between checks of the asset files; 0 disables hot reloading
+refresh_interval = float(os.environ.get("SPACE_DATA_REFRESH_SECONDS", "30"))
+if refresh_interval > 0:
+    store.start_watching(refresh_interval)
 
 if __name__ == "__main__":
     app.run_server(debug=False)
@@ -4,7 +4,7 @@ from data_processing import categorize_major
 # Import other necessary modules
 
 
-def astronaut_callbacks(app, df_astronauts):
+def astronaut_callbacks(app, store):
     @app.callback(
         [
             Output("bar-chart", "figure"),
@@ -18,6 +18,7 @@ def astronaut_callbacks(app, df_astronauts):
         ],
     )
     def update_visualizations(selected_year_range, selected_status, selected_gender):
+        df_astronauts = store.current().df_astronauts
         filtered_df = df_astronauts[
             (df_astronauts["Year"] >= selected_year_range[0]) & (df_astronauts["Year"] <= selected_year_range[1])
         ]
@@ -78,12 +79,13 @@ def astronaut_callbacks(app, df_astronauts):
         # Return all the figures
         return bar_fig, map_fig, bubble_fig
 
-def mission_time_series_callback(app, df_space_missions):
+def mission_time_series_callback(app, store):
     @app.callback(
         Output("missions-time-series", "figure"),
         [Input("mission-status-dropdown", "value")],
     )
     def update_mission_time_series(selected_status):
+        df_space_missions = store.current().df_space_missions
         filtered_df = df_space_missions[
             df_space_missions["MissionStatus"] == selected_status
         ]
@@ -117,12 +119,13 @@ def mission_time_series_callback(app, df_space_missions):
         )
         return fig
 
-def mission_3d_scatter_callback(app, df_space_missions):
+def mission_3d_scatter_callback(app, store):
     @app.callback(
         Output("3d-scatter-plot", "figure"),
         [Input("company-filter", "value")],  # Add other inputs as needed
     )
     def update_3d_scatter(selected_companies):
+        df_space_missions = store.current().df_space_missions
         filtered_df = df_space_missions
         if selected_companies:
             filtered_df = filtered_df[df_space_missions["Company"].isin(selected_companies)]
@@ -1,12 +1,9 @@
 import pandas as pd 
 import base64
-import matplotlib.pyplot as plt
 from collections import Counter 
-from wordcloud import WordCloud
 from io import BytesIO
 from dash import html
 
-df_mission_failure = pd.read_csv("assets/Space_Corrected.csv", encoding="ISO-8859-1")
 #Load and preprocess data 
 # Function to categorize majors based on keywords
 
@@ -39,87 +36,144 @@ def categorize_major(major):
             return "Typical"
     return "Wacky/Unusual"
 
+def year_intervals(years, origin):
+    """
+    Assign each year to a 5-year interval anchored at a fixed origin year.
+
+    Parameters:
+    years (Series): Integer years to bin.
+    origin (int): First year of the first interval.
+
+    Returns:
+    Series: Interval labels as strings, e.g. "[1959, 1964)".
+    """
+    if years.empty:
+        return years.astype(str)
+    # Edges up to the first one past the latest year, so that year gets an
+    # interval whichever rows are binned together
+    intervals = pd.cut(years, bins=range(origin, years.max() + 6, 5), right=False)
+    return intervals.astype(str)
+
+def clean_astronauts(df_astronauts, year_origin=None):
+    """
+    Apply the row-level cleaning steps to raw astronaut rows.
+
+    Parameters:
+    df_astronauts (DataFrame): Raw rows as read from astronauts.csv.
+    year_origin (int, optional): Anchor of the 5-year intervals. Defaults to
+    the earliest year in the rows, which is what a full load uses.
+
+    Returns:
+    DataFrame: Cleaned astronaut rows.
+    """
+    df_astronauts = df_astronauts[df_astronauts["Year"].notna()].copy()
+    df_astronauts["Year"] = df_astronauts["Year"].astype(int)
+    if df_astronauts.empty:
+        # e.g. appended rows that all lack a Year: nothing left to derive
+        return df_astronauts.assign(**{"Year Interval": "", "State": "", "Major Category": ""})
+    if year_origin is None:
+        year_origin = df_astronauts["Year"].min()
+    # Create 5-year bins
+    df_astronauts["Year Interval"] = year_intervals(df_astronauts["Year"], year_origin)
+
+    # Extract state from 'Birth Place'
+    df_astronauts["State"] = df_astronauts["Birth Place"].str.split(",").str[-1].str.strip()
+
+    # Apply this function to the 'Undergraduate Major' column
+    df_astronauts["Major Category"] = df_astronauts["Undergraduate Major"].apply(lambda x: categorize_major(x))
+    return df_astronauts
+
+def aggregate_astronauts(df_astronauts):
+    """
+    Build the astronaut aggregates used by the layout.
+
+    Parameters:
+    df_astronauts (DataFrame): Cleaned astronaut rows.
+
+    Returns:
+    tuple: (major_counts, state_counts) DataFrames.
+    """
+    # Count the number of astronauts in each categorized major
+    major_counts = (
+        df_astronauts.groupby(["Major Category", "Undergraduate Major"])
+        .size()
+        .reset_index(name="Number of Astronauts")
+    )
+
+    # Count the number of astronauts per state
+    state_counts = df_astronauts["State"].value_counts().reset_index()
+    state_counts.columns = ["State", "Astronaut Count"]
+    return major_counts, state_counts
+
 def load_and_preprocess_data_astronauts(file_path):
     """
     Load and preprocess astronaut data.
 
     Parameters:
-    file_path (str): Path to the CSV file.
-    keywords (list): List of keywords for categorizing majors.
+    file_path (str or file-like): Path to the CSV file.
 
     Returns:
     DataFrame: Preprocessed astronaut data.
     """
-    keywords = [
-        "Engineering",
-        "Science",
-        "Physics",
-        "Mathematics",
-        "Chemistry",
-        "Biology",
-        "Astronomy",
-        "Aeronautics",
-    ]
-
     try:
         # Dataframe
         df_astronauts = pd.read_csv(file_path)
-        
+
         # * Data pre-processing - astronauts.csv
-        df_astronauts = df_astronauts[df_astronauts["Year"].notna()]
-        df_astronauts["Year"] = df_astronauts["Year"].astype(int)
-        # Create 5-year bins
-        df_astronauts["Year Interval"] = pd.cut(
-            df_astronauts["Year"], bins=range(df_astronauts["Year"].min(), df_astronauts["Year"].max() + 5, 5), right=False
-        )
-        df_astronauts["Year Interval"] = df_astronauts["Year Interval"].astype(str)
-
-        # Extract state from 'Birth Place'
-        df_astronauts["State"] = df_astronauts["Birth Place"].str.split(",").str[-1].str.strip()
-
-        # Apply this function to the 'Undergraduate Major' column
-        df_astronauts["Major Category"] = df_astronauts["Undergraduate Major"].apply(lambda x: categorize_major(x))
-        # Count the number of astronauts in each categorized major
-        major_counts = (
-            df_astronauts.groupby(["Major Category", "Undergraduate Major"])
-            .size()
-            .reset_index(name="Number of Astronauts")
-        )
-
-        # Count the number of astronauts per state
-        state_counts = df_astronauts["State"].value_counts().reset_index()
-        state_counts.columns = ["State", "Astronaut Count"]
+        df_astronauts = clean_astronauts(df_astronauts)
+        major_counts, state_counts = aggregate_astronauts(df_astronauts)
 
         return df_astronauts, major_counts, state_counts
     except FileNotFoundError: 
         print(f"File not found: {file_path}")
         return None
 
-def generate_wordcloud(df):
+def count_missions(df):
     """
-    Generate a word cloud image from the 'Missions' column of the dataframe.
+    Count how often each mission appears in the 'Missions' column.
 
     Parameters:
     df (DataFrame): Dataframe containing the 'Missions' column.
 
     Returns:
-    html.Img: HTML image component of the word cloud.
+    Counter: Mission name -> number of astronauts that flew it.
     """
     # Split the 'Missions' column into individual missions and count them
-    mission_list = df["Missions"].dropna().str.split(", ").sum()
-    mission_counts = Counter(mission_list)
+    mission_counts = Counter()
+    for missions in df["Missions"].dropna().str.split(", "):
+        mission_counts.update(missions)
+    return mission_counts
+
+# Number of missions drawn in the word cloud (the WordCloud default)
+WORDCLOUD_WORDS = 200
+
+def render_wordcloud(mission_counts):
+    """
+    Render a word cloud image from mission frequencies.
+
+    Parameters:
+    mission_counts (Counter): Mission name -> frequency.
+
+    Returns:
+    html.Img: HTML image component of the word cloud.
+    """
+    # Heavy imports, only needed when a word cloud is actually rendered
+    from matplotlib.figure import Figure
+    from wordcloud import WordCloud
 
     # Generate the word cloud from frequencies
     wordcloud = WordCloud(
-        width=800, height=400, background_color="white"
+        width=800, height=400, background_color="white", max_words=WORDCLOUD_WORDS
     ).generate_from_frequencies(mission_counts)
 
     # Convert the word cloud image to a string of base64 to display in Dash
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wordcloud, interpolation="bilinear")
-    plt.axis("off")
+    # (Figure instead of pyplot: no global state, so it is safe off the main thread)
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.imshow(wordcloud, interpolation="bilinear")
+    ax.axis("off")
     img = BytesIO()
-    plt.savefig(img, format="png", bbox_inches="tight", pad_inches=0)
+    fig.savefig(img, format="png", bbox_inches="tight", pad_inches=0)
     img.seek(0)
     wordcloud_string = base64.b64encode(img.getvalue()).decode()
 
@@ -130,12 +184,87 @@ def generate_wordcloud(df):
 
     return wordcloud_image
 
+def generate_wordcloud(df):
+    """
+    Generate a word cloud image from the 'Missions' column of the dataframe.
+
+    Parameters:
+    df (DataFrame): Dataframe containing the 'Missions' column.
+
+    Returns:
+    html.Img: HTML image component of the word cloud.
+    """
+    return render_wordcloud(count_missions(df))
+
+def clean_missions(df_space_missions):
+    """
+    Apply the row-level cleaning steps to raw space mission rows.
+
+    Parameters:
+    df_space_missions (DataFrame): Raw rows as read from space_missions.csv.
+
+    Returns:
+    DataFrame: Cleaned space mission rows.
+    """
+    # Convert 'Date' to datetime and extract the year
+    df_space_missions["Date"] = pd.to_datetime(df_space_missions["Date"])
+    df_space_missions["Year"] = df_space_missions["Date"].dt.year
+    # Extract country name from 'Location'
+    df_space_missions["Country"] = (
+        df_space_missions["Location"].str.split(",").str[-1].str.strip()
+    )
+    return df_space_missions
+
+def company_status_shares(status_counts):
+    """
+    Add company totals and global percentages to (Company, MissionStatus) counts.
+
+    Parameters:
+    status_counts (DataFrame): Columns Company, MissionStatus and Count.
+
+    Returns:
+    DataFrame: The counts with TotalMissions and Percentage columns.
+    """
+    # Calculate the total missions for each company
+    total_missions_per_company = (
+        status_counts.groupby("Company")["Count"].sum().reset_index(name="TotalMissions")
+    )
+    # Merge to get total missions alongside status counts
+    grouped_df = pd.merge(status_counts, total_missions_per_company, on="Company")
+    # Calculate total missions
+    total_missions = grouped_df["Count"].sum()
+    # Calculate the percentage for each company
+    grouped_df["Percentage"] = grouped_df["Count"] / total_missions * 100
+    return grouped_df
+
+def aggregate_missions(df_space_missions):
+    """
+    Build the space mission aggregates used by the layout.
+
+    Parameters:
+    df_space_missions (DataFrame): Cleaned space mission rows.
+
+    Returns:
+    tuple: (missions_per_country, grouped_df) DataFrames.
+    """
+    # Count the number of missions per country
+    missions_per_country = df_space_missions["Country"].value_counts().reset_index()
+    missions_per_country.columns = ["Country", "Number of Missions"]
+
+    # Group by company and mission status
+    status_counts = (
+        df_space_missions.groupby(["Company", "MissionStatus"])
+        .size()
+        .reset_index(name="Count")
+    )
+    return missions_per_country, company_status_shares(status_counts)
+
 def load_and_preprocess_data_missions(file_path):
     """
     Load and preprocess space missions data.
 
     Parameters:
-    file_path (str): Path to the CSV file.
+    file_path (str or file-like): Path to the CSV file.
 
     Returns:
     DataFrame: Preprocessed space missions data.
@@ -144,38 +273,9 @@ def load_and_preprocess_data_missions(file_path):
         df_space_missions = pd.read_csv(file_path, encoding="ISO-8859-1")
 
         # * Data pre-processing for the space missions:
-        # Convert 'Date' to datetime and extract the year
-        df_space_missions["Date"] = pd.to_datetime(df_space_missions["Date"])
-        df_space_missions["Year"] = df_space_missions["Date"].dt.year
-        # Group by year and count the number of missions
-        missions_per_year = (
-            df_space_missions.groupby("Year").size().reset_index(name="Number of Missions")
-        )
-        # Extract country name from 'Location'
-        df_space_missions["Country"] = (
-            df_space_missions["Location"].str.split(",").str[-1].str.strip()
-        )
-        # Count the number of missions per country
-        missions_per_country = df_space_missions["Country"].value_counts().reset_index()
-        missions_per_country.columns = ["Country", "Number of Missions"]
-
-        # Group by company and mission status
-        grouped_df = (
-            df_space_missions.groupby(["Company", "MissionStatus"])
-            .size()
-            .reset_index(name="Count")
-        )
-        # Calculate the total missions for each company
-        total_missions_per_company = (
-            grouped_df.groupby("Company")["Count"].sum().reset_index(name="TotalMissions")
-        )
-        # Merge to get total missions alongside status counts
-        grouped_df = pd.merge(grouped_df, total_missions_per_company, on="Company")
-        # Calculate total missions
-        total_missions = grouped_df["Count"].sum()
-        # Calculate the percentage for each company
-        grouped_df["Percentage"] = grouped_df["Count"] / total_missions * 100
-        
+        df_space_missions = clean_missions(df_space_missions)
+        missions_per_country, grouped_df = aggregate_missions(df_space_missions)
+
         return df_space_missions, missions_per_country, grouped_df
     except FileNotFoundError: 
         print(f"File not found: {file_path}")
@@ -257,4 +357,9 @@ def process_mission_success(df):
     df['weekday'] = df['Datum'].apply(lambda datetime: datetime.weekday())
     df['Launch Vehicles'] = df['Detail'].apply(lambda x:getVehicles(x))
 
+    #mission cost in million dollars, 0 when unknown
+    df[' Rocket'] = df[' Rocket'].apply(lambda x: str(x).replace(',',''))
+    df[' Rocket'] = df[' Rocket'].astype('float64')
+    df[' Rocket'] = df[' Rocket'].fillna(0)
+
     return df
\ No newline at end of file
@@ -0,0 +1,438 @@
+import hashlib
+import os
+import threading
+import traceback
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+from io import BytesIO
+
+import pandas as pd
+
+from data_processing import (
+    clean_astronauts,
+    aggregate_astronauts,
+    clean_missions,
+    aggregate_missions,
+    company_status_shares,
+    count_missions,
+    render_wordcloud,
+    WORDCLOUD_WORDS,
+)
+
+# Read the CSVs with the same encodings the loaders use
+ENCODINGS = {"missions": "ISO-8859-1", "astronauts": "utf-8"}
+# Appended row frames kept apart before they are concatenated anyway
+MAX_PARTS = 64
+
+
+@dataclass(frozen=True)
+class DatasetVersion:
+    """
+    Immutable snapshot of the dashboard data.
+
+    Callbacks grab one snapshot at the start of a request and use only that
+    object, so a refresh landing mid-request never mixes two versions. The
+    frames inside must be treated as read-only.
+
+    The row frames are kept as the tuple of frames appended so far and only
+    concatenated the first time `df_astronauts` or `df_space_missions` is
+    read, so a refresh does not copy every row.
+    """
+
+    version: int
+    astronaut_parts: tuple
+    major_counts: pd.DataFrame
+    state_counts: pd.DataFrame
+    mission_counts: dict
+    wordcloud_image: object
+    mission_parts: tuple
+    missions_per_country: pd.DataFrame
+    grouped_df: pd.DataFrame
+    year_origin: int
+
+    @cached_property
+    def df_astronauts(self):
+        return _concat_parts(self.astronaut_parts)
+
+    @cached_property
+    def df_space_missions(self):
+        return _concat_parts(self.mission_parts)
+
+
+@dataclass
+class _TailedFile:
+    """Read position of an append-only CSV source."""
+
+    kind: str
+    path: str
+    header: bytes = b""
+    offset: int = 0
+    # Hash of the bytes before `offset`, to tell appends from rewrites
+    digest: object = field(default_factory=hashlib.sha1)
+    mtime: float = 0.0
+
+
+def _read_bytes(path, start=0, end=None):
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read() if end is None else f.read(end - start)
+
+
+def _read_header(path):
+    with open(path, "rb") as f:
+        return f.readline()
+
+
+def _concat_parts(parts):
+    if len(parts) == 1:
+        return parts[0]
+    return pd.concat(parts, ignore_index=True)
+
+
+def _extend_parts(current, parts_name, frame_name, df_new):
+    """The parts of `current` plus `df_new`, starting from the concatenated
+    frame when it was already built."""
+    if frame_name in current.__dict__:
+        parts = (current.__dict__[frame_name],)
+    else:
+        parts = getattr(current, parts_name)
+    parts += (df_new,)
+    if len(parts) > MAX_PARTS:
+        parts = (_concat_parts(parts),)
+    return parts
+
+
+def _top_words(mission_counts):
+    """The missions the word cloud draws, with their counts."""
+    return Counter(mission_counts).most_common(WORDCLOUD_WORDS)
+
+
+def _merge_counts(old, new, keys, value):
+    """Add two count tables on `keys`; cost depends on the number of groups only."""
+    merged = pd.concat([old[keys + [value]], new[keys + [value]]])
+    return merged.groupby(keys, as_index=False)[value].sum()
+
+
+def merge_astronauts(current, df_new):
+    """
+    Fold cleaned astronaut rows into a snapshot.
+
+    Parameters:
+    current (DatasetVersion): Snapshot to extend.
+    df_new (DataFrame): Cleaned rows not yet in the snapshot.
+
+    Returns:
+    DatasetVersion: New snapshot sharing nothing mutable with `current`.
+    """
+    major_delta, state_delta = aggregate_astronauts(df_new)
+    major_counts = _merge_counts(
+        current.major_counts, major_delta, ["Major Category", "Undergraduate Major"], "Number of Astronauts"
+    )
+    state_counts = (
+        _merge_counts(current.state_counts, state_delta, ["State"], "Astronaut Count")
+        .sort_values("Astronaut Count", ascending=False, kind="stable")
+        .reset_index(drop=True)
+    )
+    mission_counts = dict(current.mission_counts)
+    for mission, count in count_missions(df_new).items():
+        mission_counts[mission] = mission_counts.get(mission, 0) + count
+
+    # Rendering takes about a second: only redo it when the drawn words change
+    wordcloud_image = current.wordcloud_image
+    if _top_words(mission_counts) != _top_words(current.mission_counts):
+        wordcloud_image = render_wordcloud(mission_counts)
+
+    return replace(
+        current,
+        version=current.version + 1,
+        astronaut_parts=_extend_parts(current, "astronaut_parts", "df_astronauts", df_new),
+        major_counts=major_counts,
+        state_counts=state_counts,
+        mission_counts=mission_counts,
+        wordcloud_image=wordcloud_image,
+    )
+
+
+def merge_missions(current, df_new):
+    """
+    Fold cleaned space mission rows into a snapshot.
+
+    Parameters:
+    current (DatasetVersion): Snapshot to extend.
+    df_new (DataFrame): Cleaned rows not yet in the snapshot.
+
+    Returns:
+    DatasetVersion: New snapshot sharing nothing mutable with `current`.
+    """
+    country_delta, grouped_delta = aggregate_missions(df_new)
+    missions_per_country = (
+        _merge_counts(current.missions_per_country, country_delta, ["Country"], "Number of Missions")
+        .sort_values("Number of Missions", ascending=False, kind="stable")
+        .reset_index(drop=True)
+    )
+    status_counts = _merge_counts(current.grouped_df, grouped_delta, ["Company", "MissionStatus"], "Count")
+
+    return replace(
+        current,
+        version=current.version + 1,
+        mission_parts=_extend_parts(current, "mission_parts", "df_space_missions", df_new),
+        missions_per_country=missions_per_country,
+        grouped_df=company_status_shares(status_counts),
+    )
+
+
+class DatasetStore:
+    """
+    Holds the current DatasetVersion and refreshes it from the asset files.
+
+    The base CSVs are tailed: rows appended to them are parsed, cleaned and
+    folded into the aggregates on their own, so a refresh costs time
+    proportional to the new rows. Extra delta files (append-only CSVs with the
+    same header as their base file) are tailed the same way. Any other kind of
+    edit to a file triggers a full rebuild.
+
+    Readers call `current()` and never block: publishing a new version is a
+    single reference swap.
+    """
+
+    def __init__(self, missions_path, astronauts_path, delta_paths=None, load=True):
+        """
+        Parameters:
+        missions_path (str): Path to space_missions.csv.
+        astronauts_path (str): Path to astronauts.csv.
+        delta_paths (list, optional): (kind, path) pairs of delta CSVs, where
+        kind is "missions" or "astronauts".
+        load (bool): Load the data now. When False the caller runs
+        `load_missions`/`load_astronauts` (possibly concurrently) and
+        publishes the result with `install`.
+        """
+        self._bases = {"missions": missions_path, "astronauts": astronauts_path}
+        self._delta_paths = list(delta_paths or [])
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._watcher = None
+        self._stop = threading.Event()
+        self._current = None
+        self._sources = []
+        if load:
+            self._rebuild()
+
+    def current(self):
+        """Return the latest published DatasetVersion."""
+        return self._current
+
+    def subscribe(self, listener):
+        """Call `listener(version)` every time a new version is published."""
+        self._listeners.append(listener)
+
+    def _publish(self, version):
+        self._current = version
+        for listener in self._listeners:
+            listener(version)
+
+    def _load_kind(self, kind):
+        """Read the base file and delta files of one kind; return (sources, rows)."""
+        sources, frames = [], []
+        paths = [(self._bases[kind], True)]
+        paths += [(path, False) for delta_kind, path in self._delta_paths if delta_kind == kind]
+        for path, is_base in paths:
+            tail = _TailedFile(kind, path)
+            sources.append(tail)
+            if not is_base and not os.path.exists(path):
+                # Picked up by the watcher once it appears
+                continue
+            tail.header = _read_header(path)
+            chunk = self._complete_lines(_read_bytes(path))
+            self._advance(tail, chunk, os.stat(path).st_mtime)
+            if is_base or len(chunk) > len(tail.header):
+                frames.append(pd.read_csv(BytesIO(chunk), encoding=ENCODINGS[kind]))
+        return sources, pd.concat(frames, ignore_index=True)
+
+    def load_missions(self):
+        """
+        Load, clean and aggregate all space mission rows.
+
+        Returns:
+        dict: Parts of a DatasetVersion, to be passed to `install`.
+        """
+        sources, df_space_missions = self._load_kind("missions")
+        df_space_missions = clean_missions(df_space_missions)
+        missions_per_country, grouped_df = aggregate_missions(df_space_missions)
+        return {
+            "sources": sources,
+            "df_space_missions": df_space_missions,
+            "missions_per_country": missions_per_country,
+            "grouped_df": grouped_df,
+        }
+
+    def load_astronauts(self):
+        """
+        Load, clean and aggregate all astronaut rows.
+
+        Returns:
+        dict: Parts of a DatasetVersion, to be passed to `install`.
+        """
+        sources, df_astronauts = self._load_kind("astronauts")
+        df_astronauts = clean_astronauts(df_astronauts)
+        major_counts, state_counts = aggregate_astronauts(df_astronauts)
+        return {
+            "sources": sources,
+            "df_astronauts": df_astronauts,
+            "major_counts": major_counts,
+            "state_counts": state_counts,
+            "mission_counts": dict(count_missions(df_astronauts)),
+            "year_origin": int(df_astronauts["Year"].min()),
+        }
+
+    def install(self, missions, astronauts, wordcloud_image=None):
+        """
+        Publish a version built from `load_missions` and `load_astronauts`.
+
+        Parameters:
+        missions (dict): Result of `load_missions`.
+        astronauts (dict): Result of `load_astronauts`.
+        wordcloud_image (html.Img, optional): Rendered word cloud, rendered
+        here when not given.
+        """
+        missions, astronauts = dict(missions), dict(astronauts)
+        self._sources = missions.pop("sources") + astronauts.pop("sources")
+        missions["mission_parts"] = (missions.pop("df_space_missions"),)
+        astronauts["astronaut_parts"] = (astronauts.pop("df_astronauts"),)
+        if wordcloud_image is None:
+            wordcloud_image = render_wordcloud(astronauts["mission_counts"])
+        previous = self._current.version if self._current is not None else 0
+        self._publish(
+            DatasetVersion(version=previous + 1, wordcloud_image=wordcloud_image, **missions, **astronauts)
+        )
+
+    def _rebuild(self):
+        """Load everything from scratch and reset all read positions."""
+        self.install(self.load_missions(), self.load_astronauts())
+
+    @staticmethod
+    def _complete_lines(data):
+        """The part of `data` up to and including its last newline."""
+        return data[: data.rfind(b"\n") + 1]
+
+    @staticmethod
+    def _advance(tail, chunk, mtime):
+        """Move the read position past `chunk`, read from the current position."""
+        tail.offset += len(chunk)
+        tail.digest.update(chunk)
+        tail.mtime = mtime
+
+    @staticmethod
+    def _start_delta(tail):
+        """Position a delta file right after its header row."""
+        tail.header = _read_header(tail.path)
+        tail.offset = len(tail.header)
+        tail.digest = hashlib.sha1(tail.header)
+
+    def _is_append(self, tail, size):
+        """True when the file only grew since the last read: the bytes read so far are unchanged."""
+        if size < tail.offset:
+            return False
+        # Only runs when the size or mtime changed, and reading the prefix is
+        # still much cheaper than parsing it again
+        digest = hashlib.sha1()
+        remaining = tail.offset
+        with open(tail.path, "rb") as f:
+            while remaining:
+                block = f.read(min(remaining, 1 << 20))
+                if not block:
+                    return False
+                digest.update(block)
+                remaining -= len(block)
+        return digest.digest() == tail.digest.digest()
+
+    def _poll_sources(self):
+        """
+        Apply pending appends; return True when a new version was published.
+
+        Read positions only move once the new rows are merged, so a poll that
+        fails part way leaves them to the next one.
+        """
+        pending = {"missions": [], "astronauts": []}
+        read = []
+        for tail in self._sources:
+            if not os.path.exists(tail.path):
+                continue
+            stat = os.stat(tail.path)
+            if stat.st_mtime == tail.mtime and stat.st_size == tail.offset:
+                continue
+            if not tail.header:
+                # A delta file that did not exist when the store was built
+                self._start_delta(tail)
+            if not self._is_append(tail, stat.st_size):
+                # Rows were edited or removed: start over from all files
+                self._rebuild()
+                return True
+            chunk = self._complete_lines(_read_bytes(tail.path, tail.offset))
+            if chunk:
+                read.append((tail, chunk, stat.st_mtime))
+                pending[tail.kind].append(
+                    pd.read_csv(BytesIO(tail.header + chunk), encoding=ENCODINGS[tail.kind])
+                )
+
+        if not read:
+            return False
+        version = self._current
+        if pending["astronauts"]:
+            df_new = clean_astronauts(pd.concat(pending["astronauts"], ignore_index=True), version.year_origin)
+            if len(df_new) and df_new["Year"].min() < version.year_origin:
+                # Earlier years move the 5-year interval anchor for every row
+                self._rebuild()
+                return True
+            if len(df_new):
+                version = merge_astronauts(version, df_new)
+        if pending["missions"]:
+            df_new = clean_missions(pd.concat(pending["missions"], ignore_index=True))
+            if len(df_new):
+                version = merge_missions(version, df_new)
+        published = version is not self._current
+        if published:
+            self._publish(replace(version, version=self._current.version + 1))
+        for tail, chunk, mtime in read:
+            self._advance(tail, chunk, mtime)
+        return published
+
+    def refresh(self):
+        """
+        Check all sources once and publish a new version if anything changed.
+
+        Returns:
+        bool: Whether a new version was published.
+        """
+        with self._lock:
+            try:
+                return self._poll_sources()
+            except (OSError, pd.errors.ParserError, ValueError) as error:
+                # Keep serving the last good version; the next poll retries
+                print(f"Data refresh failed: {error}")
+                return False
+
+    def start_watching(self, interval=30.0):
+        """Poll the sources from a daemon thread every `interval` seconds."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        def watch():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception:
+                    # A bug in one poll must not stop the reloading for good
+                    print("Data refresh crashed:")
+                    traceback.print_exc()
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=watch, name="data-refresh", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """Stop the polling thread started by `start_watching`."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
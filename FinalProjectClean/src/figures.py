@@ -2,12 +2,10 @@ import plotly.express as px
 import plotly.graph_objs as go
 import pandas as pd
 from plotly.subplots import make_subplots
-from sklearn.preprocessing import LabelEncoder
-from sklearn.impute import SimpleImputer
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.pipeline import Pipeline
-from sklearn.model_selection import train_test_split
-import xgboost as xgb
+
+# scikit-learn and xgboost are imported inside the functions that use them:
+# they take longer to import than everything else in the app, and workers
+# that get these figures from the preloaded master never need them.
 
 def create_choropleth_figure(df, title, locations, locationmode, color, scope=None):
     """
@@ -119,6 +117,8 @@ def create_scatterplot_major(df,x,y,size,color,title):
     return fig
 
 def create_group_bar_chart(df):
+    from sklearn.preprocessing import LabelEncoder
+
     encoder = LabelEncoder()
     encoder.fit(df['Status Mission'])
     colors = {0 : 'red', 1 : 'Orange', 2 : 'Yellow', 3 : 'Green'}
@@ -254,10 +254,7 @@ def failed_missions_calendar(df):
     return fig
 
 def average_mission_cost(df):
-    df[' Rocket'] = df[' Rocket'].apply(lambda x: str(x).replace(',',''))
-    df[' Rocket'] = df[' Rocket'].astype('float64')
-    df[' Rocket'] = df[' Rocket'].fillna(0)
-
+    # ' Rocket' is converted to float by process_mission_success
     costDict = dict(df[df[' Rocket'] > 0].groupby('year')[' Rocket'].mean())
     fig = go.Figure(go.Scatter(x = list(costDict.keys()), y = list(costDict.values()), yaxis = 'y2',mode = 'lines',showlegend=False,name = 'Average Mission Cost Over the years'))
     fig.update_layout(margin=dict(l=80, r=80, t=50, b=10),
@@ -280,11 +277,13 @@ def average_mission_cost_companies(df):
     return fig
 
 def xgboost_importance_factors(df):
-    # Assuming 'df' is your DataFrame
-    df['Target'] = (~(df['Status Mission'] == 'Success')).astype('int32')
-    # Select features and target
-    X = df[['Company Name', 'Country', 'year', 'month', 'weekday']]  # Assuming ' Rocket' is either dropped or correctly processed elsewhere
-    y = df['Target']
+    import xgboost as xgb
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.model_selection import train_test_split
+
+    # Select features and target (copies, so the shared frame is never modified)
+    X = df[['Company Name', 'Country', 'year', 'month', 'weekday']].copy()  # Assuming ' Rocket' is either dropped or correctly processed elsewhere
+    y = (~(df['Status Mission'] == 'Success')).astype('int32').rename('Target')
 
     # Initialize the LabelEncoder
     encoder = LabelEncoder()
@@ -4,36 +4,8 @@ from figures import (
     create_choropleth_figure,
     create_sunburst,
     create_scatterplot_major,
-    create_group_bar_chart,
-    company_sunburst,
-    company_success_bar_chart,
-    treemap_success,
-    failed_missions_calendar,
-    average_mission_cost,
-    average_mission_cost_countries,
-    average_mission_cost_companies,
-    xgboost_importance_factors,
 )
-from data_processing import (
-    load_and_preprocess_data_astronauts,
-    load_and_preprocess_data_missions,
-    generate_wordcloud,
-    load_mission_success,
-    process_mission_success
-)
-
-
-# Load and preprocess the data
-df_space_missions, missions_per_country, grouped_df = load_and_preprocess_data_missions(
-    "assets/space_missions.csv"
-)
-df_astronauts, major_counts, state_counts = load_and_preprocess_data_astronauts(
-    "assets/astronauts.csv"
-)
-df_mission_success = load_mission_success("assets/Space_Corrected.csv")
 
-df_ms = process_mission_success(df_mission_success)
-wordcloud_image = generate_wordcloud(df_astronauts)
 
 spacex_image = html.Img(
     src="assets/spacex.jpeg",
@@ -256,7 +228,7 @@ def create_missions_card(missions_per_country, grouped_df, df_space_missions):
     return missions_card
 
 
-def create_failure_explanation_card(spacex_image):
+def create_failure_explanation_card(spacex_image, df_mission_success, failure_figures):
     return dbc.Card(
         dbc.CardBody(
             [
@@ -330,7 +302,7 @@ def create_failure_explanation_card(spacex_image):
                         ),  # Adjust the width as needed
                         dbc.Col(success_rate_image, width=4),
                         dbc.Col(
-                            dcc.Graph(id="company-success-sunburst", figure=company_sunburst(df_ms), style={
+                            dcc.Graph(id="company-success-sunburst", figure=failure_figures["company-success-sunburst"], style={
                                 "width": "450px",
                                 "height": "325px",
                                 "margin": "auto",
@@ -381,7 +353,7 @@ def create_failure_explanation_card(spacex_image):
 
                         dbc.Col(dcc.Graph(
                                 id="mission-success-per-country",
-                                figure=create_group_bar_chart(df_ms),
+                                figure=failure_figures["mission-success-per-country"],
                         ),width=8),   
                     ]
                 ), 
@@ -405,7 +377,7 @@ def create_failure_explanation_card(spacex_image):
                         dbc.Col(
                             dcc.Graph(
                                 id="company-bar-chart",
-                                figure=(company_success_bar_chart(df_ms)),
+                                figure=failure_figures["company-bar-chart"],
                             ),
                             width=9,
                         ),
@@ -415,7 +387,7 @@ def create_failure_explanation_card(spacex_image):
                         ),
                         dcc.Graph(
                             id="tree-map",
-                            figure=(treemap_success(df_ms)),
+                            figure=failure_figures["tree-map"],
                         ),
                         html.Hr(),
                     ]
@@ -439,7 +411,7 @@ def create_failure_explanation_card(spacex_image):
                             """), width = 4), 
                         dbc.Col(dcc.Graph(
                             id = "calendar-graph", 
-                            figure = failed_missions_calendar(df_ms)
+                            figure = failure_figures["calendar-graph"]
                         ), width = 8),
                         html.Hr()
                     ]
@@ -454,7 +426,7 @@ def create_failure_explanation_card(spacex_image):
                             """), width = 4),
                         dbc.Col(dcc.Graph(
                             id = "average-mission-cost", 
-                            figure = average_mission_cost(df_ms)
+                            figure = failure_figures["average-mission-cost"]
                         ), width = 8),
                         html.Hr(),
                     ]
@@ -469,13 +441,13 @@ def create_failure_explanation_card(spacex_image):
                         dbc.Col(
                             dcc.Graph(
                                 id="country-cost-evolution", 
-                                figure = average_mission_cost_countries(df_ms)
+                                figure = failure_figures["country-cost-evolution"]
                             ),width = 6
                         ), 
                         dbc.Col(
                             dcc.Graph(
                                 id = "company-cost-evolution", 
-                                figure = average_mission_cost_companies(df_ms)
+                                figure = failure_figures["company-cost-evolution"]
                             ), width = 6
                         ), 
                     ]
@@ -506,7 +478,7 @@ def create_failure_explanation_card(spacex_image):
                         dbc.Col(
                             dcc.Graph(
                                 id = "xgboost-importance-factors", 
-                                figure = xgboost_importance_factors(df_ms)
+                                figure = failure_figures["xgboost-importance-factors"]
                             ), width = 6
                         ),
                         html.Hr(),
@@ -526,6 +498,7 @@ def create_tabs(
     wordcloud_image,
     missions_per_country,
     grouped_df,
+    failure_explanation_card,
 ):
     learn_card = create_learn_card()
     astronaut_card = create_astronaut_card(
@@ -534,7 +507,6 @@ def create_tabs(
     missions_card = create_missions_card(
         missions_per_country, grouped_df, df_space_missions
     )
-    failure_explanation_card = create_failure_explanation_card(spacex_image)
 
     return dbc.Tabs(
         [
@@ -561,6 +533,7 @@ def create_layout(
     wordcloud_image,
     missions_per_country,
     grouped_df,
+    failure_explanation_card,
 ):
     footer = html.Div(
         dcc.Markdown(
@@ -596,6 +569,7 @@ def create_layout(
                         wordcloud_image,
                         missions_per_country,
                         grouped_df,
+                        failure_explanation_card,
                     ),
                     width=12,
                     className="mt-4 border",
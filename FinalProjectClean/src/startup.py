@@ -0,0 +1,174 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from data_processing import load_mission_success, process_mission_success, render_wordcloud
+from figures import (
+    company_sunburst,
+    create_group_bar_chart,
+    company_success_bar_chart,
+    treemap_success,
+    failed_missions_calendar,
+    average_mission_cost,
+    average_mission_cost_countries,
+    average_mission_cost_companies,
+    xgboost_importance_factors,
+)
+
+
+class StartupPipeline:
+    """
+    Runs named startup steps as a dependency graph.
+
+    Each step is a function that receives the results of its dependencies as
+    positional arguments, in the order they were declared. Steps whose
+    dependencies are done run concurrently on a thread pool: most of the work
+    (CSV parsing, XGBoost, image encoding) releases the GIL, and threads let
+    the steps hand DataFrames and figures to each other without pickling.
+    Steps must not modify the objects they receive.
+    """
+
+    def __init__(self):
+        self.steps = {}
+        self.timings = {}
+
+    def add(self, name, func, deps=()):
+        """
+        Declare a step.
+
+        Parameters:
+        name (str): Unique step name; also the key of its result.
+        func (callable): Called with the results of `deps`.
+        deps (tuple): Names of steps that must finish first.
+        """
+        if name in self.steps:
+            raise ValueError(f"Duplicate startup step: {name}")
+        missing = [dep for dep in deps if dep not in self.steps]
+        if missing:
+            # Declaring dependencies first also rules out cycles
+            raise ValueError(f"Step {name} depends on undeclared steps: {missing}")
+        self.steps[name] = (func, tuple(deps))
+
+    def _timed(self, name, func, args):
+        start = time.perf_counter() - self._t0
+        try:
+            return func(*args)
+        finally:
+            end = time.perf_counter() - self._t0
+            self.timings[name] = (start, end, threading.current_thread().name)
+
+    def run(self, max_workers=None):
+        """
+        Run every step.
+
+        Parameters:
+        max_workers (int, optional): Pool size. Defaults to the
+        ThreadPoolExecutor default (CPU count + 4, at most 32).
+
+        Returns:
+        dict: Step name -> result.
+        """
+        results = {}
+        pending = dict(self.steps)
+        running = {}
+        self.timings = {}
+        self._t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers, thread_name_prefix="startup") as pool:
+            while pending or running:
+                for name, (func, deps) in list(pending.items()):
+                    if all(dep in results for dep in deps):
+                        args = [results[dep] for dep in deps]
+                        running[pool.submit(self._timed, name, func, args)] = name
+                        del pending[name]
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    # Re-raises the step's exception; queued steps are dropped
+                    results[name] = future.result()
+        self.wall_time = time.perf_counter() - self._t0
+        return results
+
+    def critical_path(self):
+        """
+        Longest chain of dependent steps by measured duration.
+
+        Returns:
+        tuple: (list of step names, seconds spent along the chain).
+        """
+        best = {}
+        for name, (_, deps) in self.steps.items():
+            duration = self.timings[name][1] - self.timings[name][0]
+            previous = max((best[dep] for dep in deps), key=lambda item: item[1], default=([], 0.0))
+            best[name] = (previous[0] + [name], previous[1] + duration)
+        return max(best.values(), key=lambda item: item[1])
+
+    def waterfall(self, width=50):
+        """
+        Format the per-step timings as a text waterfall.
+
+        Parameters:
+        width (int): Characters used for the whole run.
+
+        Returns:
+        str: One line per step, ordered by start time, plus totals.
+        """
+        scale = width / self.wall_time if self.wall_time else 0
+        lines = []
+        for name, (start, end, _) in sorted(self.timings.items(), key=lambda item: item[1][0]):
+            offset = int(start * scale)
+            bar = "#" * max(1, int(end * scale) - offset)
+            lines.append(
+                f"{name:<32} {start * 1000:8.0f}ms {(end - start) * 1000:8.0f}ms  {' ' * offset}{bar}"
+            )
+        total = sum(end - start for start, end, _ in self.timings.values())
+        path, path_time = self.critical_path()
+        lines.append(
+            f"wall {self.wall_time * 1000:.0f}ms, sum of steps {total * 1000:.0f}ms, "
+            f"critical path {path_time * 1000:.0f}ms: {' -> '.join(path)}"
+        )
+        return "\n".join(lines)
+
+
+def build_startup_pipeline(store, success_path="assets/Space_Corrected.csv"):
+    """
+    Declare the dashboard's startup steps.
+
+    Parameters:
+    store (DatasetStore): Store created with load=False; the pipeline loads
+    and installs its first version.
+    success_path (str): Path to Space_Corrected.csv.
+
+    Returns:
+    StartupPipeline: Pipeline whose results include "dataset" (the store's
+    first DatasetVersion), "df_ms" (processed Space_Corrected table) and one
+    entry per failure-analysis figure, keyed by graph id.
+    """
+    pipeline = StartupPipeline()
+    pipeline.add("missions", store.load_missions)
+    pipeline.add("astronauts", store.load_astronauts)
+    pipeline.add("wordcloud", lambda astronauts: render_wordcloud(astronauts["mission_counts"]), ["astronauts"])
+
+    def install(missions, astronauts, wordcloud_image):
+        store.install(missions, astronauts, wordcloud_image)
+        return store.current()
+
+    pipeline.add("dataset", install, ["missions", "astronauts", "wordcloud"])
+
+    pipeline.add("mission_success", lambda: load_mission_success(success_path))
+    # process_mission_success adds columns in place; keep the raw table intact
+    pipeline.add("df_ms", lambda df: process_mission_success(df.copy()), ["mission_success"])
+
+    figure_steps = {
+        "company-success-sunburst": company_sunburst,
+        "mission-success-per-country": create_group_bar_chart,
+        "company-bar-chart": company_success_bar_chart,
+        "tree-map": treemap_success,
+        "calendar-graph": failed_missions_calendar,
+        "average-mission-cost": average_mission_cost,
+        "country-cost-evolution": average_mission_cost_countries,
+        "company-cost-evolution": average_mission_cost_companies,
+        "xgboost-importance-factors": xgboost_importance_factors,
+    }
+    for graph_id, builder in figure_steps.items():
+        pipeline.add(graph_id, builder, ["df_ms"])
+    return pipeline
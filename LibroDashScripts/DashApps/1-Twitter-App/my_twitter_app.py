@@ -1,34 +1,21 @@
-import pandas as pd
 import plotly.express as px
 
 from dash import Dash, dcc, html, Input, Output
 
-# Preparing data for usage ***************************
-
-df = pd.read_csv("tweets.csv") #GLOBAL VARIABLES SHOULD NEVER BE ALTERED. 
-# print(df.info())
-# print(df.describe)
-
-df["name"] = pd.Series(df["name"]).str.lower()
-# print(df["date_time"].head())
+from tweet_store import TweetStore, load_tweets
 
-# Specify the correct date format
-df["date_time"] = pd.to_datetime(
-    df["date_time"], format="%d/%m/%Y %H:%M", errors="coerce"
-)
+# Preparing data for usage ***************************
 
-df = (
-    df.groupby(
-        [df["date_time"].dt.date, "name"]
-    )[  # Group by day, without the hour, and by name.
-        ["number_of_likes", "number_of_shares"]
-    ]  # This basically means that we want to group the number of likes and the number of shares by date and by user.
-    .mean()
-    .astype(int)
-)
+tweets = load_tweets("tweets.csv") #GLOBAL VARIABLES SHOULD NEVER BE ALTERED. 
+# print(tweets.info())
+# print(tweets.describe)
 
-df = df.reset_index()  # Sort
+# Group by day, week and month, without the hour, and by name: the mean of the
+# likes and shares of each user, stored user by user (see tweet_store.py), so
+# picking a user is a slice and not a filter over every row.
+store = TweetStore(tweets)
 
+df, resolution = store.query(store.names)
 fig = px.line(data_frame=df, x="date_time", y="number_of_likes",
  color="name", log_y=True, height=300)
 
@@ -56,8 +43,7 @@ app.layout = html.Div(
             dcc.Dropdown(
                 id="my-dropdown",
                 multi=True,
-                options=[{"label": x, "value": x} 
-                         for x in sorted(df["name"].unique())],
+                options=store.options, # Las opciones salen del índice de cuentas
                 value=["taylorswift13", "cristiano", "jtimberlake"],
                 style={"color":"green"}
             ),
@@ -93,7 +79,7 @@ def update_graph(chosen_value): #Chosen value se refiere a los valores del dropd
     if len(chosen_value) == 0: 
         return {}
     else: 
-        df_filtered = df[df["name"].isin(chosen_value)]
+        df_filtered, resolution = store.query(chosen_value)
         fig = px.line(
             data_frame = df_filtered, 
             x="date_time", 
@@ -101,7 +87,7 @@ def update_graph(chosen_value): #Chosen value se refiere a los valores del dropd
             color="name", 
             log_y=True, 
             labels={
-                "number_of_likes":"Likes", 
+                "number_of_likes":f"Likes (mean per {resolution})", 
                 "date_time":"Date", 
                 "name": "Celebrity",
             },
@@ -0,0 +1,146 @@
+"""
+Likes and shares of every account rolled up by day, week and month.
+
+The chart asks for the accounts chosen and the visible date range; the store
+answers with the finest rollup that keeps each line under MAX_BUCKETS points
+over that range, then thins every line down to POINTS_PER_TRACE points with
+Largest-Triangle-Three-Buckets, which keeps the peaks and dips that a plain
+every-nth sample would drop.
+
+Each rollup is stored by columns, sorted by account and date, with the names
+dictionary-encoded: account i owns rows offsets[i]:offsets[i + 1], so
+choosing k accounts is k slices instead of a scan of the whole table.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# Points drawn per account
+POINTS_PER_TRACE = int(os.environ.get("TWITTER_POINTS", 400))
+# A rollup is used while it has at most this many buckets in the visible range
+MAX_BUCKETS = 4 * POINTS_PER_TRACE
+
+# name, pandas period, approximate length in days, from finest to coarsest
+RESOLUTIONS = [("day", "D", 1), ("week", "W", 7), ("month", "M", 30.4)]
+
+
+def load_tweets(path="tweets.csv"):
+    """tweets with lowercase names and parsed dates"""
+    df = pd.read_csv(path)
+    df["name"] = df["name"].str.lower()
+    # Specify the correct date format
+    df["date_time"] = pd.to_datetime(df["date_time"], format="%d/%m/%Y %H:%M", errors="coerce")
+    return df.dropna(subset=["date_time"])
+
+
+COLUMNS = ["date_time", "number_of_likes", "number_of_shares", "tweets"]
+
+
+class Rollup:
+    """mean likes and shares and number of tweets per account and period,
+    dated by the start of the period, as arrays sorted by account and date
+    """
+
+    def __init__(self, tweets, codes, n_accounts, period):
+        start = tweets["date_time"].dt.to_period(period).dt.start_time
+        df = tweets.groupby([codes, start]).agg(
+            number_of_likes=("number_of_likes", "mean"),
+            number_of_shares=("number_of_shares", "mean"),
+            tweets=("number_of_likes", "size"),
+        )
+        df[["number_of_likes", "number_of_shares"]] = (
+            df[["number_of_likes", "number_of_shares"]].astype(int)
+        )
+        # groupby sorts by account code, then date
+        account = df.index.get_level_values(0).to_numpy()
+        df = df.reset_index(level=1)
+        self.columns = {column: df[column].to_numpy() for column in COLUMNS}
+        self.offsets = np.searchsorted(account, np.arange(n_accounts + 1))
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def slice(self, code, low, high):
+        """rows of account code dated between low and high, as a dataframe"""
+        first, stop = self.offsets[code], self.offsets[code + 1]
+        dates = self.columns["date_time"][first:stop]
+        # dates are sorted within an account
+        i = np.searchsorted(dates, np.datetime64(low), side="left")
+        j = np.searchsorted(dates, np.datetime64(high), side="right")
+        return pd.DataFrame(
+            {column: values[first + i : first + j] for column, values in self.columns.items()}
+        )
+
+
+def lttb(x, y, n_out):
+    """indices of the n_out points of (x, y) picked by Largest-Triangle-Three-
+    Buckets: the first and last points, and in each bucket in between the one
+    making the largest triangle with the point picked before it and the mean
+    of the next bucket
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    every = (n - 2) / (n_out - 2)
+    picked = np.empty(n_out, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        mean_x, mean_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - mean_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (mean_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+class TweetStore:
+    def __init__(self, tweets):
+        codes, names = pd.factorize(tweets["name"], sort=True)
+        self.names = list(names)
+        self.codes = {name: code for code, name in enumerate(self.names)}
+        # the dropdown options, built once with the index
+        self.options = [{"label": name, "value": name} for name in self.names]
+        self.rollups = {
+            name: Rollup(tweets, codes, len(names), period) for name, period, _ in RESOLUTIONS
+        }
+        days = self.rollups["day"].columns["date_time"]
+        self.first, self.last = pd.Timestamp(days.min()), pd.Timestamp(days.max())
+
+    def resolution(self, start, end):
+        """the finest rollup with at most MAX_BUCKETS buckets in start..end"""
+        span = (end - start) / pd.Timedelta(days=1)
+        for name, _, days in RESOLUTIONS:
+            if span / days <= MAX_BUCKETS:
+                return name
+        return RESOLUTIONS[-1][0]
+
+    def query(self, names, start=None, end=None):
+        """(rows to plot for the accounts in names between start and end,
+        resolution used)
+        """
+        start = self.first if start is None else max(pd.Timestamp(start), self.first)
+        end = self.last if end is None else min(pd.Timestamp(end), self.last)
+        resolution = self.resolution(start, end)
+        # buckets are dated by their start: take the one before start too,
+        # so the lines reach the left edge
+        days = dict((name, days) for name, _, days in RESOLUTIONS)[resolution]
+        low = start - pd.Timedelta(days=days)
+
+        lines = []
+        for name in names:
+            if name not in self.codes:
+                continue
+            line = self.rollups[resolution].slice(self.codes[name], low, end)
+            # thinned on the log scale the likes are drawn with
+            x = line["date_time"].to_numpy().astype("int64").astype(float)
+            y = np.log10(line["number_of_likes"].clip(lower=1).to_numpy())
+            lines.append(line.iloc[lttb(x, y, POINTS_PER_TRACE)].assign(name=name))
+        if not lines:
+            return pd.DataFrame(columns=COLUMNS + ["name"]), resolution
+        return pd.concat(lines, ignore_index=True), resolution
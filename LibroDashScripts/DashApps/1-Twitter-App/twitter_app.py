@@ -1,23 +1,13 @@
-import pandas as pd
 import plotly.express as px
 
-from dash import Dash, dcc, html, Input, Output
+from dash import Dash, dcc, html, Input, Output, ctx, no_update
+
+from tweet_store import TweetStore, load_tweets
 
 # Preparing your data for usage *******************************************
 
-df = pd.read_csv("tweets.csv")
-df["name"] = pd.Series(df["name"]).str.lower()
-# Specify the correct date format
-df["date_time"] = pd.to_datetime(df["date_time"], format="%d/%m/%Y %H:%M", errors='coerce')
-
-df = (
-    df.groupby([df["date_time"].dt.date, "name"])[
-        ["number_of_likes", "number_of_shares"]
-    ]
-    .mean()
-    .astype(int)
-)
-df = df.reset_index()
+# Daily, weekly and monthly means per account (see tweet_store.py)
+store = TweetStore(load_tweets("tweets.csv"))
 
 
 # App Layout **************************************************************
@@ -40,10 +30,7 @@ app.layout = html.Div(
                     dcc.Dropdown(
                         id="my-dropdown",
                         multi=True,
-                        options=[
-                            {"label": x, "value": x}
-                            for x in sorted(df["name"].unique())
-                        ],
+                        options=store.options,
                         value=["taylorswift13", "cristiano", "jtimberlake"],
                     ),
                     className="three columns",
@@ -67,30 +54,60 @@ app.layout = html.Div(
 # Callbacks ***************************************************************
 @app.callback(
     Output(component_id="line-chart", component_property="figure"),
-    [Input(component_id="my-dropdown", component_property="value")],
+    [
+        Input(component_id="my-dropdown", component_property="value"),
+        Input(component_id="line-chart", component_property="relayoutData"),
+    ],
 )
 
-def update_graph(chosen_value):
+def update_graph(chosen_value, relayout):
     print(f"Values chosen by user: {chosen_value}")
 
+    if ctx.triggered_id == "line-chart" and not changes_x_range(relayout):
+        # autosize and y axis events, including the ones the new figure
+        # itself fires, do not change what is drawn
+        return no_update
     if len(chosen_value) == 0:
         return {}
     else:
-        df_filtered = df[df["name"].isin(chosen_value)]
+        # zooming in redraws the visible range at a finer resolution
+        start, end = visible_range(relayout)
+        df_filtered, resolution = store.query(chosen_value, start, end)
         fig = px.line(
             data_frame=df_filtered,
             x="date_time",
             y="number_of_likes",
             color="name",
             log_y=True,
+            hover_data=["tweets"],
             labels={
-                "number_of_likes": "Likes",
+                "number_of_likes": f"Likes (mean per {resolution})",
                 "date_time": "Date",
                 "name": "Celebrity",
+                "tweets": "Tweets",
             },
         )
+        if start is not None:
+            fig.update_xaxes(range=[start, end])
         return fig
 
 
+def changes_x_range(relayout):
+    """whether a relayout event zoomed, panned or reset the x axis"""
+    return any(key.startswith("xaxis.range") or key == "xaxis.autorange" for key in relayout or {})
+
+
+def visible_range(relayout):
+    """x range of the chart after a zoom or pan, (None, None) when it shows
+    everything
+    """
+    relayout = relayout or {}
+    if "xaxis.range[0]" in relayout:
+        return relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]
+    if "xaxis.range" in relayout:
+        return tuple(relayout["xaxis.range"])
+    return None, None
+
+
 if __name__ == "__main__":
     app.run_server(debug=True)
@@ -1,6 +1,7 @@
 import dash_bootstrap_components as dbc
 from pandas_datareader import wb # Import World Bank dataset 
 import pandas as pd
+from wb_data import load_catalog # Indicator catalog, cached on disk
 
 countries = wb.get_countries()
 print(countries.head(10)[['name']])
@@ -12,9 +13,9 @@ countries = countries.rename(columns={"name":"country"})
 
 
 # Hace esto en caso de que cambie el valor de la columna de la API. Smort
-df = wb.get_indicators()[['id','name']]
-df = df[df.name == 'CO2 emissions (kt)']
-print(df)
+# El catálogo se descarga una vez por semana (cache/), y se busca por nombre
+catalog = load_catalog()
+print(catalog.id('CO2 emissions (kt)'))
 
 #Indiv using the Internet (%age of the population) -> IT.NET.USER.ZS
 #Proportion of seats held by women in national parliaments (%) -> SG.GEN.PARL.ZS
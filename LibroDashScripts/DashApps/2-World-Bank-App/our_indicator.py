@@ -1,10 +1,10 @@
-import pandas as pd
-from pandas_datareader import wb
+from wb_data import load_catalog
 
 # Hace esto en caso de que cambie el valor de la columna de la API. Smort
-df = wb.get_indicators()[['id','name']]
-df = df[df.name == 'CO2 emissions (kt)']
-print(df)
+# El catálogo se descarga una vez por semana (cache/), y se busca por nombre
+catalog = load_catalog()
+print(catalog.id('CO2 emissions (kt)'))
+print(catalog.search('CO2 emissions'))
 
 #Indiv using the Internet (%age of the population) -> IT.NET.USER.ZS
 #Proportion of seats held by women in national parliaments (%) -> SG.GEN.PARL.ZS
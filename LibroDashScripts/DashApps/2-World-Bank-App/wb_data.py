@@ -0,0 +1,351 @@
+"""
+World Bank data for the app, behind a shared on-disk cache.
+
+Every download is saved as a Parquet file in cache/, keyed by what was asked
+for (indicators, country set, year range), and reused until it is older than
+WB_CACHE_TTL seconds (default one day). Then a single worker refreshes it: the
+others keep serving the stale copy meanwhile, and if the refresh fails the
+stale copy stays. A refresh that returns the same data only renews the file's
+age, so its version does not change.
+
+The indicator catalog is cached the same way for WB_CATALOG_TTL seconds
+(default a week), see load_catalog.
+
+Set WB_OFFLINE=1 to use OfflineSource, a deterministic stand-in with the
+shape of the World Bank responses, to run the app without network access.
+"""
+import difflib
+import hashlib
+import json
+import os
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+CACHE_TTL = int(os.environ.get("WB_CACHE_TTL", 24 * 60 * 60))
+CATALOG_TTL = int(os.environ.get("WB_CATALOG_TTL", 7 * 24 * 60 * 60))
+
+
+class WorldBankSource:
+    """the World Bank API, through the concurrent client of wb_fetch.py"""
+
+    def __init__(self):
+        from wb_fetch import WorldBankClient
+
+        self.client = WorldBankClient()
+
+    def get_countries(self):
+        return self.client.get_countries()
+
+    def get_indicators(self):
+        return self.client.get_indicators()
+
+    def download(self, indicators, countries, start, end):
+        return self.client.download(indicators, countries, start, end)
+
+
+class OfflineSource:
+    """made-up but stable data shaped like the World Bank responses
+
+    Countries come from the gapminder sample bundled with plotly; each
+    indicator follows a smooth random path seeded by country and indicator.
+    """
+
+    def get_countries(self):
+        import plotly.express as px
+
+        countries = px.data.gapminder()[["country", "iso_alpha"]]
+        countries = countries.drop_duplicates("iso_alpha")
+        return pd.DataFrame(
+            {
+                "iso3c": countries["iso_alpha"].to_numpy(),
+                "name": countries["country"].to_numpy(),
+                "capitalCity": "offline",
+            }
+        )
+
+    def get_indicators(self):
+        return pd.DataFrame(
+            [
+                ("IT.NET.USER.ZS", "Individuals using the Internet (% of population)"),
+                (
+                    "SG.GEN.PARL.ZS",
+                    "Proportion of seats held by women in national parliaments (%)",
+                ),
+                ("EN.ATM.CO2E.KT", "CO2 emissions (kt)"),
+                ("NY.GDP.PCAP.CD", "GDP per capita (current US$)"),
+                ("SP.POP.TOTL", "Population, total"),
+                ("SP.DYN.LE00.IN", "Life expectancy at birth, total (years)"),
+            ],
+            columns=["id", "name"],
+        ).assign(source="World Development Indicators")
+
+    def indicator_values(self, indicator, iso3c, years):
+        rng = np.random.default_rng(zlib.crc32(f"{indicator}/{iso3c}".encode()))
+        t = np.asarray(years) - 2005
+        if indicator.endswith(".ZS"):  # percentages: an s-curve towards a ceiling
+            ceiling = rng.uniform(20, 95)
+            midpoint = rng.uniform(0, 15)
+            values = ceiling / (1 + np.exp(-(t - midpoint) / rng.uniform(2, 5)))
+        else:  # quantities: exponential growth from a log-uniform base
+            values = 10 ** rng.uniform(2, 6) * (1 + rng.uniform(-0.02, 0.06)) ** t
+        values = values * rng.normal(1, 0.03, size=len(t))
+        # a few missing years, like the real data
+        values[rng.random(len(t)) < 0.05] = np.nan
+        return values
+
+    def download(self, indicators, countries, start, end):
+        names = self.get_countries().set_index("iso3c")["name"]
+        years = np.arange(start, end + 1)
+        frames = []
+        for iso3c in countries:
+            frame = pd.DataFrame({"country": names[iso3c], "year": years.astype(str)})
+            for indicator in indicators:
+                frame[indicator] = self.indicator_values(indicator, iso3c, years)
+            frames.append(frame)
+        # newest year first, indexed like wb.download
+        df = pd.concat(frames, ignore_index=True)
+        return df.sort_values(["country", "year"], ascending=[True, False]).set_index(
+            ["country", "year"]
+        )
+
+
+def get_source():
+    if os.environ.get("WB_OFFLINE") == "1":
+        return OfflineSource()
+    return WorldBankSource()
+
+
+def data_version(df):
+    """hash of the contents of a dataframe"""
+    hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    return hashlib.sha1(hashes.tobytes() + ",".join(df.columns).encode()).hexdigest()[:16]
+
+
+def _try_lock(f, blocking):
+    if fcntl is not None:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+    # msvcrt locks the first byte; LK_LOCK itself gives up after 10 seconds
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.1)
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def _lock(path, blocking):
+    """exclusive lock on path across processes; yields whether it was acquired"""
+    with open(path, "a+") as f:
+        f.seek(0)
+        if not _try_lock(f, blocking):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            _unlock(f)
+
+
+class DataCache:
+    """Parquet files with a time to live, shared by all workers on the host"""
+
+    def __init__(self, directory=CACHE_DIR, ttl=CACHE_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        # last (version, dataframe) read by this process for each key
+        self._memory = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, key):
+        """(base of the data file names, meta file, lock file)"""
+        name = hashlib.sha1(json.dumps(key).encode()).hexdigest()[:16]
+        base = os.path.join(self.directory, f"{key[0]}-{name}")
+        return base, base + ".json", base + ".lock"
+
+    def _data_path(self, base, version):
+        # one file per version: the meta file only points at complete ones
+        return f"{base}-{version}.parquet"
+
+    def _is_fresh(self, path):
+        return os.path.exists(path) and time.time() - os.path.getmtime(path) < self.ttl
+
+    def read(self, key):
+        """(dataframe, version) of a cached key, or (None, None)
+
+        The Parquet file is only read again when its version changed.
+        """
+        base, meta_path, _ = self._paths(key)
+        memory_key = json.dumps(key)
+        # a writer may replace the version and delete its file between
+        # reading the meta file and the data: read the meta file again
+        for _ in range(3):
+            try:
+                with open(meta_path) as f:
+                    version = json.load(f)["version"]
+                if memory_key in self._memory and self._memory[memory_key][0] == version:
+                    return self._memory[memory_key][1], version
+                df = pd.read_parquet(self._data_path(base, version))
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, KeyError):
+                return None, None
+            self._memory[memory_key] = (version, df)
+            return df, version
+        return None, None
+
+    def _write(self, key, df, version, old_version):
+        base, meta_path, _ = self._paths(key)
+        data_path = self._data_path(base, version)
+        # write then rename, so readers never see a partial file, and the
+        # data before the meta file that points at it
+        df.to_parquet(data_path + ".tmp", index=False)
+        os.replace(data_path + ".tmp", data_path)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"key": key, "version": version, "fetched_at": time.time()}, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        if old_version:
+            try:
+                os.remove(self._data_path(base, old_version))
+            except OSError:  # already gone, or still open on Windows
+                pass
+
+    def get(self, key, fetch):
+        """(dataframe, version) for key, calling fetch() when it is missing or stale"""
+        _, meta_path, lock_path = self._paths(key)
+        if self._is_fresh(meta_path):
+            return self.read(key)
+
+        have_copy = os.path.exists(meta_path)
+        # with a stale copy, whoever gets the lock refreshes and everyone
+        # else serves the stale copy; without one, everyone waits for it
+        with _lock(lock_path, blocking=not have_copy) as refreshing:
+            if not refreshing or self._is_fresh(meta_path):
+                return self.read(key)
+
+            old, old_version = self.read(key)
+            try:
+                df = fetch()
+            except Exception as error:
+                if old is None:
+                    raise
+                print(f"World Bank refresh failed, keeping the cached data: {error!r}")
+                return old, old_version
+
+            version = data_version(df)
+            if version == old_version:
+                os.utime(meta_path)  # unchanged: only renew its age
+                return old, old_version
+            self._write(key, df, version, old_version)
+            self._memory[json.dumps(key)] = (version, df)
+            return df, version
+
+
+_default_cache = None
+
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DataCache()
+    return _default_cache
+
+
+def load_countries(cache=None, source=None):
+    """countries with a capital city (no aggregates), as country/iso3c columns"""
+    cache = cache or default_cache()
+    source = source or get_source()
+
+    def fetch():
+        countries = source.get_countries()
+        countries["capitalCity"] = countries["capitalCity"].replace({"": None})
+        countries = countries.dropna(subset=["capitalCity"])
+        countries = countries[["name", "iso3c"]]
+        countries = countries[countries["name"] != "Kosovo"]
+        return countries.rename(columns={"name": "country"}).reset_index(drop=True)
+
+    return cache.get(["countries", type(source).__name__], fetch)[0]
+
+
+class IndicatorCatalog:
+    """the indicator catalog with an index from indicator name to id"""
+
+    def __init__(self, df):
+        self.df = df
+        # names are not unique across sources: keep the first id, as the
+        # catalog lists World Development Indicators first
+        self.ids = dict(zip(df["name"][::-1], df["id"][::-1]))
+
+    def id(self, name):
+        """id of the indicator called name, a KeyError lists similar names"""
+        try:
+            return self.ids[name]
+        except KeyError:
+            similar = difflib.get_close_matches(name, self.ids, n=3)
+            raise KeyError(f"no indicator called {name!r}, similar: {similar}") from None
+
+    def search(self, text):
+        """id / name rows whose name contains text (case insensitive)"""
+        found = self.df["name"].str.contains(text, case=False, regex=False)
+        return self.df.loc[found, ["id", "name"]]
+
+
+def load_catalog(cache=None, source=None):
+    """the indicator catalog, downloaded at most once per CATALOG_TTL"""
+    cache = cache or DataCache(ttl=CATALOG_TTL)
+    source = source or get_source()
+    return IndicatorCatalog(
+        cache.get(["catalog", type(source).__name__], source.get_indicators)[0]
+    )
+
+
+def load_indicators(indicators, countries, start, end, cache=None, source=None):
+    """(dataframe, version) with one row per country and year and a column
+    per indicator id, plus iso3c
+    """
+    cache = cache or default_cache()
+    source = source or get_source()
+    iso3c = sorted(countries["iso3c"])
+    key = [
+        "indicators",
+        type(source).__name__,
+        sorted(indicators),
+        hashlib.sha1(",".join(iso3c).encode()).hexdigest()[:16],
+        start,
+        end,
+    ]
+
+    def fetch():
+        df = source.download(list(indicators), iso3c, start, end)
+        df = df.reset_index()
+        df.year = df.year.astype(int)
+
+        # Add country ISO3 id to main df
+        return pd.merge(df, countries, on="country")
+
+    return cache.get(key, fetch)
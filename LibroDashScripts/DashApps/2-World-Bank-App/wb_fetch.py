@@ -0,0 +1,224 @@
+"""
+Client for the World Bank v2 API (https://api.worldbank.org/v2).
+
+A download of several indicators for many countries is split into one request
+per indicator and batch of countries. The requests run in a thread pool over
+a single pooled session (WB_WORKERS at a time), and each is retried with
+exponential backoff when the connection fails or the API answers 429 / 5xx.
+
+Every finished piece is saved under cache/partial/ until the whole download is
+done, so if some pieces keep failing the next attempt only asks for those.
+
+Set WB_API_URL to point the client somewhere else, e.g. at the stand-in of
+wb_standin.py.
+"""
+import hashlib
+import json
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+API_URL = os.environ.get("WB_API_URL", "https://api.worldbank.org/v2")
+PARTIAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "partial")
+WORKERS = int(os.environ.get("WB_WORKERS", 8))
+RETRIES = int(os.environ.get("WB_RETRIES", 4))
+BATCH_SIZE = 50  # countries per request, keeps the URL short
+PER_PAGE = 1000
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class APIError(Exception):
+    """the API rejected a request, retrying will not help"""
+
+
+class IncompleteDownload(Exception):
+    """some pieces of a download still failed after all the retries"""
+
+    def __init__(self, missing, errors):
+        self.missing = missing
+        super().__init__(f"{len(missing)} requests failed, last error: {errors[-1]!r}")
+
+
+class WorldBankClient:
+    def __init__(
+        self,
+        base_url=None,
+        workers=WORKERS,
+        retries=RETRIES,
+        backoff=0.5,
+        timeout=30,
+        batch_size=BATCH_SIZE,
+        partial_dir=PARTIAL_DIR,
+        partial_ttl=24 * 60 * 60,
+    ):
+        self.base_url = (base_url or API_URL).rstrip("/")
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.partial_dir = partial_dir
+        self.partial_ttl = partial_ttl
+        # one connection per worker, kept alive between requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _get(self, path, params):
+        """one page of a response as (meta, rows), retrying transient errors"""
+        params = {"format": "json", **params}
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(
+                    f"{self.base_url}/{path}", params=params, timeout=self.timeout
+                )
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    break
+                error = requests.HTTPError(f"{response.status_code} for {path}")
+                wait = response.headers.get("Retry-After")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, wait = e, None
+            if attempt == self.retries:
+                raise error
+            # exponential backoff with jitter, so the workers do not retry
+            # all at once
+            delay = float(wait) if wait else self.backoff * 2**attempt
+            time.sleep(delay * random.uniform(0.5, 1.5))
+
+        body = response.json()
+        # errors come back with status 200 as [{"message": [...]}]
+        if len(body) == 1 and "message" in body[0]:
+            raise APIError(body[0]["message"])
+        meta, rows = body
+        return meta, rows or []
+
+    def get_all(self, path, params=None):
+        """all the rows of a paged response"""
+        params = {"per_page": PER_PAGE, **(params or {})}
+        meta, rows = self._get(path, params)
+        for page in range(2, int(meta["pages"]) + 1):
+            rows += self._get(path, {**params, "page": page})[1]
+        return rows
+
+    def get_countries(self):
+        """countries and aggregates, with the columns of wb.get_countries"""
+        rows = self.get_all("country")
+        return pd.DataFrame(
+            {
+                "iso3c": [row["id"] for row in rows],
+                "iso2c": [row["iso2Code"] for row in rows],
+                "name": [row["name"] for row in rows],
+                "region": [row["region"]["value"] for row in rows],
+                "capitalCity": [row["capitalCity"] for row in rows],
+            }
+        )
+
+    def get_indicators(self):
+        """the indicator catalog, as id / name / source columns"""
+        rows = self.get_all("indicator", {"per_page": 20000})
+        return pd.DataFrame(
+            {
+                "id": [row["id"] for row in rows],
+                "name": [row["name"] for row in rows],
+                "source": [(row.get("source") or {}).get("value") for row in rows],
+            }
+        )
+
+    def fetch_piece(self, indicator, countries, start, end):
+        """rows of one indicator for a batch of countries"""
+        rows = self.get_all(
+            f"country/{';'.join(countries)}/indicator/{indicator}",
+            {"date": f"{start}:{end}"},
+        )
+        return [
+            {
+                "country": row["country"]["value"],
+                "year": row["date"],
+                "indicator": indicator,
+                "value": row["value"],
+            }
+            for row in rows
+        ]
+
+    def _piece_path(self, download_key, indicator, batch):
+        name = hashlib.sha1(json.dumps([download_key, indicator, batch]).encode())
+        return os.path.join(self.partial_dir, download_key, name.hexdigest()[:16] + ".json")
+
+    def _read_piece(self, path):
+        try:
+            if time.time() - os.path.getmtime(path) < self.partial_ttl:
+                with open(path) as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _write_piece(self, path, rows):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump(rows, f)
+        os.replace(path + ".tmp", path)
+
+    def download(self, indicators, countries, start, end):
+        """indicator values by country and year, like wb.download: indexed by
+        country name and year (newest first), one column per indicator
+
+        Raises IncompleteDownload when some pieces could not be fetched; the
+        ones that were are kept for the next call with the same arguments.
+        """
+        countries = sorted(countries)
+        download_key = hashlib.sha1(
+            json.dumps([sorted(indicators), countries, start, end]).encode()
+        ).hexdigest()[:16]
+        batches = [
+            countries[i : i + self.batch_size]
+            for i in range(0, len(countries), self.batch_size)
+        ]
+
+        rows, to_fetch = [], {}
+        for indicator in indicators:
+            for batch in batches:
+                path = self._piece_path(download_key, indicator, batch)
+                piece = self._read_piece(path)
+                if piece is None:
+                    to_fetch[path] = (indicator, batch)
+                else:
+                    rows += piece
+        if rows:
+            print(f"World Bank download: resuming, {len(to_fetch)} requests left")
+
+        missing, errors = [], []
+        with ThreadPoolExecutor(self.workers) as pool:
+            futures = {
+                pool.submit(self.fetch_piece, indicator, batch, start, end): path
+                for path, (indicator, batch) in to_fetch.items()
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    piece = future.result()
+                except (requests.RequestException, APIError) as error:
+                    missing.append(to_fetch[path])
+                    errors.append(error)
+                    continue
+                self._write_piece(path, piece)
+                rows += piece
+        if missing:
+            raise IncompleteDownload(missing, errors)
+
+        shutil.rmtree(os.path.join(self.partial_dir, download_key), ignore_errors=True)
+
+        df = pd.DataFrame(rows, columns=["country", "year", "indicator", "value"])
+        df["value"] = pd.to_numeric(df["value"])
+        df = df.set_index(["country", "year", "indicator"])["value"].unstack("indicator")
+        df = df.reindex(columns=list(indicators))
+        df.columns.name = None
+        return df.sort_index(ascending=[True, False])
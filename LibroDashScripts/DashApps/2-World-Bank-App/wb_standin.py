@@ -0,0 +1,154 @@
+"""
+Local stand-in for the World Bank v2 API, serving the data of OfflineSource
+as the JSON the real API returns, with optional latency and failures.
+
+    python wb_standin.py --port 8000 --latency 0.3 --failure-rate 0.2
+    WB_API_URL=http://localhost:8000/v2 python worldbank.py
+
+or from Python, to try the client against it:
+
+    with StandIn(latency=0.1, failure_rate=0.3) as url:
+        WorldBankClient(url).download(["SP.POP.TOTL"], ["ARG", "ESP"], 2005, 2016)
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from wb_data import OfflineSource
+
+
+def page(rows, query):
+    """[meta, rows] for the page asked for in query, like the real API"""
+    per_page = int(query.get("per_page", ["50"])[0])
+    number = int(query.get("page", ["1"])[0])
+    meta = {
+        "page": number,
+        "pages": math.ceil(len(rows) / per_page),
+        "per_page": per_page,
+        "total": len(rows),
+    }
+    return [meta, rows[(number - 1) * per_page : number * per_page] or None]
+
+
+class Handler(BaseHTTPRequestHandler):
+    source = OfflineSource()
+    latency = 0.0
+    failure_rate = 0.0
+    requests_served = 0
+
+    def do_GET(self):
+        type(self).requests_served += 1
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = url.path.strip("/").split("/")
+        if self.latency:
+            time.sleep(random.uniform(0.5, 1.5) * self.latency)
+        if random.random() < self.failure_rate:
+            # the errors a busy API answers with
+            status = random.choice([429, 502, 503])
+            self.send_response(status)
+            if status == 429:
+                self.send_header("Retry-After", "0.1")
+            self.end_headers()
+            return
+
+        if parts[:2] == ["v2", "country"] and len(parts) == 2:
+            body = page(self.countries(), query)
+        elif parts[:2] == ["v2", "indicator"] and len(parts) == 2:
+            body = page(self.indicators(), query)
+        elif parts[:2] == ["v2", "country"] and len(parts) == 5 and parts[3] == "indicator":
+            body = page(self.values(parts[2].split(";"), parts[4], query), query)
+        else:
+            body = [{"message": [{"id": "120", "key": "Invalid value", "value": url.path}]}]
+
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def countries(self):
+        countries = self.source.get_countries()
+        return [
+            {
+                "id": row.iso3c,
+                "iso2Code": row.iso3c[:2],
+                "name": row.name,
+                "region": {"id": "", "value": ""},
+                "capitalCity": row.capitalCity,
+            }
+            for row in countries.itertuples()
+        ]
+
+    def indicators(self):
+        return [
+            {"id": row.id, "name": row.name, "source": {"id": "2", "value": row.source}}
+            for row in self.source.get_indicators().itertuples()
+        ]
+
+    def values(self, iso3c, indicator, query):
+        start, end = (int(year) for year in query["date"][0].split(":"))
+        names = self.source.get_countries().set_index("iso3c")["name"]
+        years = np.arange(start, end + 1)
+        rows = []
+        for code in iso3c:
+            if code not in names:
+                continue
+            values = self.source.indicator_values(indicator, code, years)
+            # newest year first, like the real API
+            rows += [
+                {
+                    "indicator": {"id": indicator, "value": indicator},
+                    "country": {"id": code[:2], "value": names[code]},
+                    "countryiso3code": code,
+                    "date": str(year),
+                    "value": None if np.isnan(value) else float(value),
+                }
+                for year, value in zip(years[::-1], values[::-1])
+            ]
+        return rows
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandIn:
+    """the stand-in served from a thread, as a context manager giving its url"""
+
+    def __init__(self, port=0, latency=0.0, failure_rate=0.0):
+        handler = type("StandInHandler", (Handler,), {})
+        handler.latency = latency
+        handler.failure_rate = failure_rate
+        self.handler = handler
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v2"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.url
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    stand_in = StandIn(args.port, args.latency, args.failure_rate)
+    print(f"World Bank stand-in at {stand_in.url}")
+    stand_in.server.serve_forever()
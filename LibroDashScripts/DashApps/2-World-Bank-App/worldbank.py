@@ -1,8 +1,8 @@
-from dash import Dash, html, dcc, Input, Output, State
+from dash import Dash, html, dcc, Input, Output, State, no_update
 import plotly.express as px
 import dash_bootstrap_components as dbc # Easier to manage the layout of the app. 
-import pandas as pd
-from pandas_datareader import wb # Helps to obtain data from API's and create DF's, in this case, world bank
+from wb_data import load_countries, load_indicators # World Bank downloads, cached on disk
+from year_cube import YearCube # Means over any range of years in O(countries)
 
 app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 
@@ -13,26 +13,37 @@ indicators = {
 }
 
 # get country name and ISO id for mapping on choropleth
-countries = wb.get_countries()
-countries["capitalCity"].replace({"": None}, inplace=True)
-countries.dropna(subset=["capitalCity"], inplace=True)
-countries = countries[["name", "iso3c"]]
-countries = countries[countries["name"] != "Kosovo"]
-countries = countries.rename(columns={"name": "country"})
+countries = load_countries()
+
+
+# year cube of the loaded data and its version, swapped in as one tuple so
+# that a refresh in another thread never leaves a version without its cube;
+# browser sessions only hold the version
+loaded = (None, None)
+
+
+def load_wb_data():
+    # Retrieve specific world bank data from API, or from the shared cache
+    # while it is fresh (see wb_data.py)
+    global loaded
+    df, version = load_indicators(list(indicators), countries, start=2005, end=2016)
+    if version != loaded[0]:
+        loaded = (version, YearCube(df.rename(columns=indicators), indicators.values(), 2005, 2016))
+    return loaded
 
 
 def update_wb_data():
-    # Retrieve specific world bank data from API
-    df = wb.download(
-        indicator=(list(indicators)), country=countries["iso3c"], start=2005, end=2016
-    )
-    df = df.reset_index()
-    df.year = df.year.astype(int)
+    return load_wb_data()[0]
+
 
-    # Add country ISO3 id to main df
-    df = pd.merge(df, countries, on="country")
-    df = df.rename(columns=indicators)
-    return df
+def get_wb_data(version):
+    # a session may hold a version this process has not loaded (another
+    # worker refreshed the data): use the current one, the timer will
+    # update the session
+    loaded_version, cube = loaded
+    if loaded_version != version:
+        loaded_version, cube = load_wb_data()
+    return cube
 
 
 app.layout = dbc.Container(
@@ -97,81 +108,57 @@ app.layout = dbc.Container(
                                 2016: "2016",
                             },
                         ),
-                        dbc.Button(
-                            id="my-button",
-                            children="Submit",
-                            n_clicks=0,
-                            color="primary",
-                            className="mt-4",
-                        ),
                     ],
                     width=6,
                 ),
             ]
         ),
-        dcc.Store(id="storage", storage_type="session", data={}),
+        # only the version of the data, the dataframe stays on the server
+        dcc.Store(id="storage", storage_type="session", data=None),
         dcc.Interval(id="timer", interval=1000 * 60, n_intervals=0),
     ]
 )
 
 
-@app.callback(Output("storage", "data"), Input("timer", "n_intervals"))
-def store_data(n_time):
-    dataframe = update_wb_data()
-    return dataframe.to_dict("records")
+@app.callback(
+    Output("storage", "data"),
+    Input("timer", "n_intervals"),
+    State("storage", "data"),
+)
+def store_data(n_time, stored_version):
+    version = update_wb_data()
+    if version == stored_version:
+        return no_update
+    return version
 
 
 @app.callback(
     Output("my-choropleth", "figure"),
-    Input("my-button", "n_clicks"),
     Input("storage", "data"),
-    State("years-range", "value"),
-    State("radio-indicator", "value"),
+    Input("years-range", "value"),
+    Input("radio-indicator", "value"),
 )
-def update_graph(n_clicks, stored_dataframe, years_chosen, indct_chosen):
-    dff = pd.DataFrame.from_records(stored_dataframe)
-    print(years_chosen)
-
-    if years_chosen[0] != years_chosen[1]:
-        dff = dff[dff.year.between(years_chosen[0], years_chosen[1])]
-        dff = dff.groupby(["iso3c", "country"])[indct_chosen].mean()
-        dff = dff.reset_index()
-
-        fig = px.choropleth(
-            data_frame=dff,
-            locations="iso3c",
-            color=indct_chosen,
-            scope="world",
-            hover_data={"iso3c": False, "country": True},
-            labels={
-                indicators["SG.GEN.PARL.ZS"]: "% parliament women",
-                indicators["IT.NET.USER.ZS"]: "pop % using internet",
-            },
-        )
-        fig.update_layout(
-            geo={"projection": {"type": "natural earth"}},
-            margin=dict(l=50, r=50, t=50, b=50),
-        )
-        return fig
-
-    if years_chosen[0] == years_chosen[1]:
-        dff = dff[dff["year"].isin(years_chosen)]
-        fig = px.choropleth(
-            data_frame=dff,
-            locations="iso3c",
-            color=indct_chosen,
-            scope="world",
-            hover_data={"iso3c": False, "country": True},
-            labels={
-                indicators["SG.GEN.PARL.ZS"]: "% parliament women",
-                indicators["IT.NET.USER.ZS"]: "pop % using internet",
-            },
-        )
-        fig.update_layout(
-            geo={"projection": {"type": "natural earth"}},
-            margin=dict(l=50, r=50, t=50, b=50),
-        )
-        return fig
+def update_graph(stored_version, years_chosen, indct_chosen):
+    # mean of each country over the years chosen (a single year is a range
+    # of one), read from the prefix sums of the cube
+    dff = get_wb_data(stored_version).range_mean(indct_chosen, *years_chosen)
+
+    fig = px.choropleth(
+        data_frame=dff,
+        locations="iso3c",
+        color=indct_chosen,
+        scope="world",
+        hover_data={"iso3c": False, "country": True},
+        labels={
+            indicators["SG.GEN.PARL.ZS"]: "% parliament women",
+            indicators["IT.NET.USER.ZS"]: "pop % using internet",
+        },
+    )
+    fig.update_layout(
+        geo={"projection": {"type": "natural earth"}},
+        margin=dict(l=50, r=50, t=50, b=50),
+    )
+    return fig
 
 
 if __name__ == "__main__":
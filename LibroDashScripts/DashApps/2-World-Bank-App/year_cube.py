@@ -0,0 +1,54 @@
+"""
+Country x year arrays of the indicators with prefix sums along the years.
+
+The mean of an indicator over any range of years is then one subtraction per
+country, whatever the length of the history:
+
+    sum(first..last)   = sums[:, last + 1] - sums[:, first]
+    count(first..last) = counts[:, last + 1] - counts[:, first]
+
+Missing values count as 0 in the sums and are not counted, which gives the
+same result as a groupby mean that skips NaN.
+"""
+import numpy as np
+import pandas as pd
+
+
+class YearCube:
+    def __init__(self, df, columns, first_year, last_year):
+        """df: one row per country and year with the indicator columns plus
+        country, iso3c and year. The cube spans first_year..last_year, the
+        range that was requested, with NaN for the years df has no rows for
+        """
+        self.years = np.arange(int(first_year), int(last_year) + 1)
+        index = df[["iso3c", "country"]].drop_duplicates("iso3c").sort_values("iso3c")
+        self.iso3c = index["iso3c"].to_numpy()
+        self.country = index["country"].to_numpy()
+        self.sums = {}
+        self.counts = {}
+        for column in columns:
+            # [countries, years], NaN where there is no data
+            values = (
+                df.pivot_table(index="iso3c", columns="year", values=column, dropna=False)
+                .reindex(index=self.iso3c, columns=self.years)
+                .to_numpy(dtype=float)
+            )
+            present = ~np.isnan(values)
+            sums = np.zeros((len(self.iso3c), len(self.years) + 1))
+            counts = np.zeros((len(self.iso3c), len(self.years) + 1), dtype=np.int32)
+            np.cumsum(np.where(present, values, 0), axis=1, out=sums[:, 1:])
+            np.cumsum(present, axis=1, out=counts[:, 1:])
+            self.sums[column] = sums
+            self.counts[column] = counts
+
+    def range_mean(self, column, first_year, last_year):
+        """mean of column per country over first_year..last_year, as a dataframe
+        with iso3c, country and column
+        """
+        first = int(first_year) - self.years[0]
+        stop = int(last_year) - self.years[0] + 1
+        sums, counts = self.sums[column], self.counts[column]
+        count = counts[:, stop] - counts[:, first]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, (sums[:, stop] - sums[:, first]) / count, np.nan)
+        return pd.DataFrame({"iso3c": self.iso3c, "country": self.country, column: mean})
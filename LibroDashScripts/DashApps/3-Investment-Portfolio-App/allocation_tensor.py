@@ -0,0 +1,202 @@
+"""
+Precomputed results for every allocation, start year and time horizon.
+
+The input space of the app is small: cash and stock allocations in 1% steps
+(5151 portfolios), ~95 start years and ~95 horizons. Storing every
+(allocation, start year, horizon) result would take 45M cells per statistic,
+so the tensor is kept in a compressed form that still answers each cell in
+O(1):
+
+  - prefix sums of log growth factors: ending balance ratio and CAGR of any
+    window are one subtraction,
+  - prefix sums of yearly returns and squared returns: mean and volatility,
+  - sparse tables of the index of the worst year: range minimum in two reads,
+    plus the yearly returns themselves to read the value.
+
+Arrays are saved as .npy files and loaded memory-mapped, so all gunicorn
+workers share one copy through the page cache.
+
+    python allocation_tensor.py     # (re)build cache/allocation_tensor
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtest_engine import ASSETS, BacktestEngine, allocation_weights
+
+TENSOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "allocation_tensor")
+ARRAYS = [
+    "returns",
+    "log_growth",
+    "return_sum",
+    "return_sq_sum",
+    "worst_index",
+]
+
+
+def _prefix_sum(values):
+    """prefix sums along the last axis, with a leading 0 column"""
+    out = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,))
+    np.cumsum(values, axis=-1, out=out[..., 1:])
+    return out
+
+
+def _sparse_argmin(values):
+    """sparse table for range-minimum queries along the last axis
+
+    level k holds, for every start i, the index of the (first) minimum of
+    values[..., i : i + 2**k]; shape [levels, *values.shape], int16
+    """
+    n = values.shape[-1]
+    levels = max(1, int(np.log2(n)) + 1)
+    table = np.zeros((levels,) + values.shape, dtype=np.int16)
+    table[0] = np.arange(n)
+    for k in range(1, levels):
+        half = 2 ** (k - 1)
+        left = table[k - 1][..., : n - half]
+        right = table[k - 1][..., half:]
+        take_right = np.take_along_axis(values, right, -1) < np.take_along_axis(values, left, -1)
+        table[k][..., : n - half] = np.where(take_right, right, left)
+    return table
+
+
+def _range_argmin(table, values, first, last):
+    """index of the minimum of values[..., first : last + 1] for every row"""
+    k = int(np.log2(last - first + 1))
+    left = table[k][..., first]
+    right = table[k][..., last - 2**k + 1]
+    left_value = np.take_along_axis(values, left[..., None], -1)[..., 0]
+    right_value = np.take_along_axis(values, right[..., None], -1)[..., 0]
+    return np.where(right_value < left_value, right, left)
+
+
+class AllocationTensor:
+    """Answers ending balance, CAGR, volatility and worst year lookups for any
+    allocation in 1% steps over any window of the historic returns.
+    """
+
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.first_yr = meta["first_yr"]
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        # stocks/cash percentages of each allocation row and the reverse lookup
+        stocks, cash = np.meshgrid(np.arange(101), np.arange(101), indexing="ij")
+        valid = stocks + cash <= 100
+        self.stocks, self.cash = stocks[valid], cash[valid]
+        self.row_of = np.full((101, 101), -1)
+        self.row_of[self.stocks, self.cash] = np.arange(valid.sum())
+
+    @classmethod
+    def build(cls, engine):
+        """evaluate every allocation over the whole history in one batch"""
+        stocks, cash = np.meshgrid(np.arange(101), np.arange(101), indexing="ij")
+        valid = stocks + cash <= 100
+        weights = allocation_weights(stocks[valid], cash[valid])
+
+        # [3, n_years] cash, bonds, stocks returns as published (not 1 + r - 1,
+        # which would change how worst years round)
+        asset_returns = engine.df[ASSETS].to_numpy(dtype=float).T
+        # [n_allocations, n_years] yearly portfolio returns
+        returns = weights @ asset_returns
+        arrays = {
+            "returns": returns,
+            "log_growth": _prefix_sum(np.log1p(returns)),
+            "return_sum": _prefix_sum(returns),
+            "return_sq_sum": _prefix_sum(returns**2),
+            "worst_index": _sparse_argmin(returns),
+        }
+        return cls(arrays, {"first_yr": engine.first_yr, "source": _fingerprint(engine)})
+
+    def save(self, path=TENSOR_DIR):
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(path, name + ".npy"), getattr(self, name))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(self.meta, f)
+
+    @classmethod
+    def load(cls, path=TENSOR_DIR):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in ARRAYS}
+        return cls(arrays, meta)
+
+    @classmethod
+    def load_or_build(cls, engine, path=TENSOR_DIR):
+        """use the saved tensor if it was built from the same returns,
+        otherwise rebuild and save it
+        """
+        try:
+            tensor = cls.load(path)
+            if tensor.meta["source"] == _fingerprint(engine):
+                return tensor
+        except (OSError, ValueError, KeyError):
+            pass
+        tensor = cls.build(engine)
+        try:
+            tensor.save(path)
+        except OSError:
+            pass  # read-only deploy: keep the in-memory copy
+        return tensor
+
+    def _window(self, start_yr, nper):
+        first = int(start_yr) - self.first_yr
+        return first, first + nper
+
+    def _row(self, stocks, cash):
+        row = self.row_of[int(stocks), int(cash)]
+        if row < 0:
+            raise ValueError(f"invalid allocation: {stocks}% stocks, {cash}% cash")
+        return row
+
+    def ending_ratio(self, stocks, cash, start_yr, nper):
+        """ending balance per $1 invested"""
+        first, stop = self._window(start_yr, nper)
+        log_growth = self.log_growth[self._row(stocks, cash)]
+        return float(np.exp(log_growth[stop] - log_growth[first]))
+
+    def cagr(self, stocks, cash, start_yr, nper):
+        return self.ending_ratio(stocks, cash, start_yr, nper) ** (1 / nper) - 1
+
+    def volatility(self, stocks, cash, start_yr, nper):
+        """std dev of the yearly returns of one allocation over one window"""
+        first, stop = self._window(start_yr, nper)
+        row = self._row(stocks, cash)
+        mean = (self.return_sum[row, stop] - self.return_sum[row, first]) / nper
+        mean_sq = (self.return_sq_sum[row, stop] - self.return_sq_sum[row, first]) / nper
+        return float(np.sqrt(max(mean_sq - mean**2, 0)))
+
+    def frontier(self, start_yr, nper):
+        """CAGR, volatility and worst year of every allocation over one window"""
+        first, stop = self._window(start_yr, nper)
+        mean = (self.return_sum[:, stop] - self.return_sum[:, first]) / nper
+        mean_sq = (self.return_sq_sum[:, stop] - self.return_sq_sum[:, first]) / nper
+        worst = _range_argmin(self.worst_index, self.returns, first, stop - 1)
+        return pd.DataFrame(
+            {
+                "stocks": self.stocks,
+                "cash": self.cash,
+                "bonds": 100 - self.stocks - self.cash,
+                "cagr": np.expm1((self.log_growth[:, stop] - self.log_growth[:, first]) / nper),
+                "volatility": np.sqrt(np.maximum(mean_sq - mean**2, 0)),
+                "worst": self.returns[np.arange(len(worst)), worst],
+            }
+        )
+
+
+def _fingerprint(engine):
+    return hashlib.sha1(np.ascontiguousarray(engine.factors).tobytes()).hexdigest()
+
+
+if __name__ == "__main__":
+    historic = pd.read_csv("assets/historic.csv")
+    historic = pd.concat([historic, pd.DataFrame({"Year": [historic.Year.min() - 1]})], ignore_index=True)
+    historic = historic.sort_values("Year", ignore_index=True).fillna(0)
+    tensor = AllocationTensor.build(BacktestEngine(historic))
+    tensor.save()
+    size = sum(getattr(tensor, name).nbytes for name in ARRAYS)
+    print(f"Saved {len(tensor.stocks)} allocations x {len(historic)} years to {TENSOR_DIR} ({size / 1e6:.1f} MB)")
@@ -1,9 +1,16 @@
 # -*- coding: utf-8 -*-
-from dash import Dash, dcc, html, dash_table, Input, Output, State, callback_context
+from functools import lru_cache
+
+from dash import Dash, dcc, html, dash_table, Input, Output, State, Patch, callback_context
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 import pandas as pd
 
+from backtest_engine import BacktestEngine, allocation_weights
+from allocation_tensor import AllocationTensor
+from monte_carlo import historic_returns, simulate
+from rolling import RollingAnalytics, window_stats
+
 app = Dash(
     __name__,
     external_stylesheets=[dbc.themes.SPACELAB, dbc.icons.FONT_AWESOME],
@@ -23,6 +30,16 @@ df = pd.concat([df, new_row], ignore_index=True)
 df = df.sort_values("Year", ignore_index=True)
 df = df.fillna(0)
 
+# NumPy arrays of the returns, used for every backtest
+engine = BacktestEngine(df)
+# results for every allocation, start year and horizon (see allocation_tensor.py)
+tensor = AllocationTensor.load_or_build(engine)
+# returns that Monte Carlo paths are sampled from (without the added start year)
+mc_returns = historic_returns(df[df.Year >= MIN_YR])
+# stats of every window length and start year (see rolling.py)
+rolling = RollingAnalytics(df[df.Year >= MIN_YR])
+MC_PATHS = 100_000
+MC_SEED = 2021
 
 COLORS = {
     "cash": "#3cb521",
@@ -132,8 +149,9 @@ annual_returns_pct_table = dash_table.DataTable(
 )
 
 
-def make_summary_table(dff):
-    """Make html table to show cagr and  best and worst periods"""
+def make_summary_table(start_yr, end_yr):
+    """Make html table to show cagr and  best and worst periods from the end
+    of start_yr to the end of end_yr"""
 
     table_class = "h5 text-body text-nowrap"
     cash = html.Span(
@@ -149,29 +167,39 @@ def make_summary_table(dff):
         [html.I(className="fa fa-ambulance"), " Inflation"], className=table_class
     )
 
-    start_yr = dff["Year"].iat[0]
-    end_yr = dff["Year"].iat[-1]
+    # precomputed stats of the returns from the end of start_yr to end_yr
+    stats = rolling.lookup(start_yr + 1, end_yr - start_yr)
+    assets = range(3)  # cash, bonds, stocks; no worst year for inflation
 
     df_table = pd.DataFrame(
         {
             "": [cash, bonds, stocks, inflation],
             f"Rate of Return (CAGR) from {start_yr} to {end_yr}": [
-                cagr(dff["all_cash"]),
-                cagr(dff["all_bonds"]),
-                cagr(dff["all_stocks"]),
-                cagr(dff["inflation_only"]),
+                f"{rate:.1%}" for rate in stats["cagr"]
             ],
             f"Worst 1 Year Return": [
-                worst(dff, "3-mon T.Bill"),
-                worst(dff, "10yr T.Bond"),
-                worst(dff, "S&P 500"),
-                "",
-            ],
+                f"{stats['worst'][i]:.1%} in {stats['worst_year'][i]:.0f}" for i in assets
+            ]
+            + [""],
+            "Max Drawdown": [
+                format_drawdown(stats["max_drawdown"][i], stats["recovery_years"][i])
+                for i in assets
+            ]
+            + [""],
         }
     )
     return dbc.Table.from_dataframe(df_table, bordered=True, hover=True)
 
 
+def format_drawdown(drawdown, recovery_years):
+    """drawdown and how long it took to get back to the previous high"""
+    if drawdown == 0:
+        return "none"
+    if recovery_years != recovery_years:  # NaN: not recovered in the period
+        return f"{drawdown:.1%}, not recovered"
+    return f"{drawdown:.1%}, recovered in {recovery_years:.0f} yrs"
+
+
 """
 ==========================================================================
 Figures
@@ -203,8 +231,8 @@ def make_pie(slider_input, title):
 
 
 def make_line_chart(dff):
-    start = dff.loc[1, "Year"]
-    yrs = dff["Year"].size - 1
+    start = dff["Year"][1]
+    yrs = len(dff["Year"]) - 1
     dtick = 1 if yrs < 16 else 2 if yrs in range(16, 30) else 5
 
     fig = go.Figure()
@@ -263,6 +291,118 @@ def make_line_chart(dff):
     return fig
 
 
+def make_frontier_chart(frontier, stocks, cash):
+    """risk vs return of every allocation in 1% steps for the selected period"""
+    mine = frontier[(frontier["stocks"] == stocks) & (frontier["cash"] == cash)]
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scattergl(
+            x=frontier["volatility"],
+            y=frontier["cagr"],
+            mode="markers",
+            name="All Allocations",
+            marker=dict(
+                size=4,
+                color=frontier["stocks"],
+                colorscale=[[0, COLORS["bonds"]], [1, COLORS["stocks"]]],
+                colorbar=dict(title="Stocks %"),
+            ),
+            customdata=frontier[["cash", "bonds", "stocks", "worst"]],
+            hovertemplate="Cash %{customdata[0]}%, Bonds %{customdata[1]}%, Stocks %{customdata[2]}%"
+            "<br>CAGR %{y:.1%}, Volatility %{x:.1%}<br>Worst year %{customdata[3]:.1%}<extra></extra>",
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=mine["volatility"],
+            y=mine["cagr"],
+            mode="markers",
+            name="My Portfolio",
+            marker=dict(size=14, color="black", symbol="star"),
+            hoverinfo="skip",
+        )
+    )
+    fig.update_layout(
+        title="Return vs Risk of Every Allocation",
+        template="none",
+        showlegend=False,
+        height=400,
+        margin=dict(l=50, r=10, t=60, b=55),
+        yaxis=dict(title="Rate of Return (CAGR)", tickformat=".0%"),
+        xaxis=dict(title="Volatility (std dev of yearly returns)", tickformat=".0%"),
+    )
+    return fig
+
+
+def make_monte_carlo_chart(result, start_bal):
+    """fan chart of simulated balances with the median inflation-adjusted start"""
+    bands = {p: start_bal * values for p, values in result["percentiles"].items()}
+    years = list(range(len(bands[50])))
+    fig = go.Figure()
+    for low, high, opacity in [(5, 95, 0.15), (25, 75, 0.3)]:
+        fig.add_trace(
+            go.Scatter(x=years, y=bands[high], line=dict(width=0), showlegend=False, hoverinfo="skip")
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=years,
+                y=bands[low],
+                fill="tonexty",
+                fillcolor=f"rgba(68, 110, 155, {opacity})",
+                line=dict(width=0),
+                name=f"{low}th - {high}th percentile",
+            )
+        )
+    fig.add_trace(
+        go.Scatter(x=years, y=bands[50], name="Median", marker_color="black", line=dict(width=3))
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=years,
+            y=start_bal * result["inflation"],
+            name="Start Amount + Inflation",
+            marker_color=COLORS["inflation"],
+            line=dict(dash="dot"),
+        )
+    )
+    fig.update_layout(
+        title=f"{MC_PATHS:,} Simulated Futures - {result['shortfall']:.1%} chance of losing to inflation",
+        template="none",
+        legend=dict(x=0.01, y=0.99),
+        height=400,
+        margin=dict(l=50, r=10, t=60, b=55),
+        yaxis=dict(tickprefix="$", fixedrange=True),
+        xaxis=dict(title="Years from Today", fixedrange=True),
+    )
+    return fig
+
+
+def make_rolling_chart(years, cagrs, n):
+    """CAGR of every n-year period by start year, for the benchmarks and my portfolio"""
+    fig = go.Figure()
+    for name, color, values in [
+        ("All Cash", COLORS["cash"], cagrs[0]),
+        ("All Bonds (10yr T.Bonds)", COLORS["bonds"], cagrs[1]),
+        ("All Stocks (S&P500)", COLORS["stocks"], cagrs[2]),
+        ("Inflation", COLORS["inflation"], cagrs[3]),
+    ]:
+        fig.add_trace(go.Scatter(x=years, y=values, name=name, marker_color=color))
+    fig.add_trace(
+        go.Scatter(x=years, y=cagrs[4], name="My Portfolio", marker_color="black", line=dict(width=3))
+    )
+    fig.update_layout(
+        title=f"Rate of Return (CAGR) of Every {n} Year Period",
+        template="none",
+        hovermode="x unified",
+        legend=dict(x=0.01, y=0.01, bgcolor="rgba(0,0,0,0)"),
+        height=400,
+        margin=dict(l=50, r=10, t=60, b=55),
+        yaxis=dict(tickformat=".0%", fixedrange=True),
+        xaxis=dict(title="Start Year", fixedrange=True),
+    )
+    return fig
+
+
 """
 ==========================================================================
 Make Tabs
@@ -471,93 +611,34 @@ tabs = dbc.Tabs(
 
 """
 ==========================================================================
-Helper functions to calculate investment results, cagr and worst periods
+Helper functions to calculate investment results
 """
 
 def backtest(stocks, cash, start_bal, nper, start_yr):
     """calculates the investment returns for user selected asset allocation,
-    rebalanced annually and returns a dataframe
+    rebalanced annually and returns a dict of NumPy arrays by column
+
+    The portfolio is a cumulative product over NumPy arrays of the yearly
+    returns (see backtest_engine.py) instead of a year by year loop. Making a
+    dataframe of it costs more than the backtest itself, so the callbacks
+    work on the arrays directly.
     """
+    return engine.backtest_arrays(stocks, cash, start_bal, nper, start_yr)
 
-    end_yr = start_yr + nper - 1
-    cash_allocation = cash / 100
-    stocks_allocation = stocks / 100
-    bonds_allocation = (100 - stocks - cash) / 100
 
-    # Select time period - since data is for year end, include year prior
-    # for start ie year[0]
-    dff = df[(df.Year >= start_yr - 1) & (df.Year <= end_yr)].set_index(
-        "Year", drop=False
-    )
-    dff["Year"] = dff["Year"].astype(int)
-
-    # add columns for My Portfolio returns
-    dff["Cash"] = cash_allocation * start_bal
-    dff["Bonds"] = bonds_allocation * start_bal
-    dff["Stocks"] = stocks_allocation * start_bal
-    dff["Total"] = start_bal
-    dff["Rebalance"] = True
-
-    # calculate My Portfolio returns
-    for yr in dff.Year + 1:
-        if yr <= end_yr:
-            # Rebalance at the beginning of the period by reallocating
-            # last period's total ending balance
-            if dff.loc[yr, "Rebalance"]:
-                dff.loc[yr, "Cash"] = dff.loc[yr - 1, "Total"] * cash_allocation
-                dff.loc[yr, "Stocks"] = dff.loc[yr - 1, "Total"] * stocks_allocation
-                dff.loc[yr, "Bonds"] = dff.loc[yr - 1, "Total"] * bonds_allocation
-
-            # calculate this period's  returns
-            dff.loc[yr, "Cash"] = dff.loc[yr, "Cash"] * (
-                1 + dff.loc[yr, "3-mon T.Bill"]
-            )
-            dff.loc[yr, "Stocks"] = dff.loc[yr, "Stocks"] * (1 + dff.loc[yr, "S&P 500"])
-            dff.loc[yr, "Bonds"] = dff.loc[yr, "Bonds"] * (
-                1 + dff.loc[yr, "10yr T.Bond"]
-            )
-            dff.loc[yr, "Total"] = dff.loc[yr, ["Cash", "Bonds", "Stocks"]].sum()
-
-    dff = dff.reset_index(drop=True)
-    columns = ["Cash", "Stocks", "Bonds", "Total"]
-    dff[columns] = dff[columns].round(0)
-
-    # create columns for when portfolio is all cash, all bonds or  all stocks,
-    #   include inflation too
-    #
-    # create new df that starts in yr 1 rather than yr 0
-    dff1 = (dff[(dff.Year >= start_yr) & (dff.Year <= end_yr)]).copy()
-    #
-    # calculate the returns in new df:
-    columns = ["all_cash", "all_bonds", "all_stocks", "inflation_only"]
-    annual_returns = ["3-mon T.Bill", "10yr T.Bond", "S&P 500", "Inflation"]
-    for col, return_pct in zip(columns, annual_returns):
-        dff1[col] = round(start_bal * (1 + (1 + dff1[return_pct]).cumprod() - 1), 0)
-    #
-    # select columns in the new df to merge with original
-    dff1 = dff1[["Year"] + columns]
-    dff = dff.merge(dff1, how="left")
-    # fill in the starting balance for year[0]
-    dff.loc[0, columns] = start_bal
-    return dff
-
-
-def cagr(dff):
-    """calculate Compound Annual Growth Rate for a series and returns a formated string"""
-
-    start_bal = dff.iat[0]
-    end_bal = dff.iat[-1]
-    planning_time = len(dff) - 1
-    cagr_result = ((end_bal / start_bal) ** (1 / planning_time)) - 1
-    return f"{cagr_result:.1%}"
-
-
-def worst(dff, asset):
-    """calculate worst returns for asset in selected period returns formated string"""
-
-    worst_yr_loss = min(dff[asset])
-    worst_yr = dff.loc[dff[asset] == worst_yr_loss, "Year"].iloc[0]
-    return f"{worst_yr_loss:.1%} in {worst_yr}"
+@lru_cache(maxsize=256)
+def monte_carlo(stocks, cash, planning_time):
+    """simulated growth of $1 for an allocation; the start amount only scales
+    it, so the simulation is cached without it
+    """
+    weights = allocation_weights(stocks, cash)[0]
+    return simulate(mc_returns, weights, planning_time, n_paths=MC_PATHS, seed=MC_SEED)
+
+
+def table_records(results):
+    """rows of the total_returns DataTable from the backtest arrays"""
+    columns = [col["id"] for col in total_returns_table.columns]
+    return [dict(zip(columns, row)) for row in zip(*(results[col].tolist() for col in columns))]
 
 
 """
@@ -582,6 +663,9 @@ app.layout = dbc.Container(
                     [
                         dcc.Graph(id="allocation_pie_chart", className="mb-2"),
                         dcc.Graph(id="returns_chart", className="pb-4"),
+                        dcc.Graph(id="frontier_chart", className="pb-4"),
+                        dcc.Graph(id="monte_carlo_chart", className="pb-4"),
+                        dcc.Graph(id="rolling_chart", className="pb-4"),
                         html.Hr(),
                         html.Div(id="summary_table"),
                         html.H6(datasource_text, className="my-2"),
@@ -668,10 +752,22 @@ def update_time_period(planning_time, start_yr, period_number):
     return planning_time, start_yr, period_number
 
 
+def valid_period(planning_time, start_yr):
+    """defaults for invalid inputs, and a planning time and start year that fit the data"""
+    planning_time = 1 if planning_time is None else planning_time
+    start_yr = MIN_YR if start_yr is None else int(start_yr)
+
+    # calculate valid planning time start yr
+    max_time = MAX_YR + 1 - start_yr
+    planning_time = min(max_time, planning_time)
+    if start_yr + planning_time > MAX_YR:
+        start_yr = min(df.iloc[-planning_time, 0], MAX_YR)  # 0 is Year column
+    return planning_time, int(start_yr)
+
+
 @app.callback(
     Output("total_returns", "data"),
     Output("returns_chart", "figure"),
-    Output("summary_table", "children"),
     Output("ending_amount", "value"),
     Output("cagr", "value"),
     Input("stock_bond", "value"),
@@ -683,33 +779,86 @@ def update_time_period(planning_time, start_yr, period_number):
 def update_totals(stocks, cash, start_bal, planning_time, start_yr):
     # set defaults for invalid inputs
     start_bal = 10 if start_bal is None else start_bal
-    planning_time = 1 if planning_time is None else planning_time
-    start_yr = MIN_YR if start_yr is None else int(start_yr)
+    planning_time, start_yr = valid_period(planning_time, start_yr)
 
-    # calculate valid planning time start yr
-    max_time = MAX_YR + 1 - start_yr
-    planning_time = min(max_time, planning_time)
-    if start_yr + planning_time > MAX_YR:
-        start_yr = min(df.iloc[-planning_time, 0], MAX_YR)  # 0 is Year column
-
-    # create investment returns dataframe
+    # create investment returns arrays
     dff = backtest(stocks, cash, start_bal, planning_time, start_yr)
 
     # create data for DataTable
-    data = dff.to_dict("records")
+    data = table_records(dff)
 
     # create the line chart
     fig = make_line_chart(dff)
 
-    summary_table = make_summary_table(dff)
+    # ending balance and cagr are lookups in the precomputed tensor
+    ending_ratio = tensor.ending_ratio(stocks, cash, start_yr, planning_time)
+    ending_amount = f"${start_bal * ending_ratio:0,.0f}"
+    ending_cagr = f"{ending_ratio ** (1 / planning_time) - 1:.1%}"
 
-    # format ending balance
-    ending_amount = f"${dff['Total'].iloc[-1]:0,.0f}"
+    return data, fig, ending_amount, ending_cagr
 
-    # calcluate cagr
-    ending_cagr = cagr(dff["Total"])
 
-    return data, fig, summary_table, ending_amount, ending_cagr
+@app.callback(
+    Output("summary_table", "children"),
+    Input("planning_time", "value"),
+    Input("start_yr", "value"),
+)
+def update_summary(planning_time, start_yr):
+    """the summary only depends on the period, not on the allocation"""
+    planning_time, start_yr = valid_period(planning_time, start_yr)
+    # data is as of year end, so the period starts at the end of the prior year
+    return make_summary_table(start_yr - 1, start_yr + planning_time - 1)
+
+
+@app.callback(
+    Output("frontier_chart", "figure"),
+    Input("stock_bond", "value"),
+    Input("cash", "value"),
+    Input("planning_time", "value"),
+    Input("start_yr", "value"),
+)
+def update_frontier(stocks, cash, planning_time, start_yr):
+    """the frontier of all allocations is only rebuilt when the period changes;
+    moving the sliders just moves the My Portfolio marker
+    """
+    planning_time, start_yr = valid_period(planning_time, start_yr)
+    triggered = set(callback_context.triggered_prop_ids.values())
+    if triggered and triggered <= {"stock_bond", "cash"}:
+        patch = Patch()
+        patch["data"][1]["x"] = [tensor.volatility(stocks, cash, start_yr, planning_time)]
+        patch["data"][1]["y"] = [tensor.cagr(stocks, cash, start_yr, planning_time)]
+        return patch
+    return make_frontier_chart(tensor.frontier(start_yr, planning_time), stocks, cash)
+
+
+@app.callback(
+    Output("monte_carlo_chart", "figure"),
+    Input("stock_bond", "value"),
+    Input("cash", "value"),
+    Input("starting_amount", "value"),
+    Input("planning_time", "value"),
+)
+def update_monte_carlo(stocks, cash, start_bal, planning_time):
+    """block bootstrap of the historic returns for the selected allocation"""
+    start_bal = 10 if start_bal is None else start_bal
+    planning_time = min(max(planning_time or 1, 1), MAX_YR - MIN_YR + 1)
+    return make_monte_carlo_chart(monte_carlo(stocks, cash, int(planning_time)), start_bal)
+
+
+@app.callback(
+    Output("rolling_chart", "figure"),
+    Input("stock_bond", "value"),
+    Input("cash", "value"),
+    Input("planning_time", "value"),
+)
+def update_rolling(stocks, cash, planning_time):
+    """how every historical period of the planning time would have turned out"""
+    n = min(planning_time or 1, MAX_YR - MIN_YR + 1)
+    years, stats = rolling.by_start_year(n)
+    # yearly returns of my portfolio, without the added start year
+    returns = tensor.returns[tensor._row(stocks, cash), 1:]
+    portfolio = window_stats(returns, n, MIN_YR)["cagr"]
+    return make_rolling_chart(years, list(stats["cagr"]) + [portfolio[0]], n)
 
 
 if __name__ == "__main__":
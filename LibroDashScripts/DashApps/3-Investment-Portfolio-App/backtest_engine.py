@@ -0,0 +1,146 @@
+"""
+Vectorized backtests of annually rebalanced portfolios.
+
+With rebalancing at the beginning of every year, a portfolio's value only
+depends on the blended yearly growth factor
+
+    1 + cash * r_cash + bonds * r_bonds + stocks * r_stocks
+
+so the whole history is one cumulative product. Doing it with NumPy for many
+allocations at once replaces the year-by-year `.loc` loop.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+# Order of the asset columns in the weight arrays: cash, bonds, stocks
+ASSETS = ["3-mon T.Bill", "10yr T.Bond", "S&P 500"]
+BENCHMARKS = ASSETS + ["Inflation"]
+BENCHMARK_COLUMNS = ["all_cash", "all_bonds", "all_stocks", "inflation_only"]
+
+
+def allocation_weights(stocks, cash):
+    """make an [n_allocations, 3] array of cash, bonds, stocks fractions from
+    stock and cash percentages (scalars or arrays); bonds get the rest
+    """
+    stocks = np.atleast_1d(np.asarray(stocks, dtype=float)) / 100
+    cash = np.atleast_1d(np.asarray(cash, dtype=float)) / 100
+    stocks, cash = np.broadcast_arrays(stocks, cash)
+    return np.stack([cash, 1 - stocks - cash, stocks], axis=1)
+
+
+class BacktestEngine:
+    """Holds the historic returns as arrays and runs backtests over them.
+
+    `df` is the app's historic table: one row per year, consecutive years,
+    starting with the zero-return row for the year before the data starts.
+    """
+
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.years = self.df["Year"].to_numpy(dtype=int)
+        if np.any(np.diff(self.years) != 1):
+            raise ValueError("historic returns must have one row per consecutive year")
+        self.first_yr = int(self.years[0])
+        self.last_yr = int(self.years[-1])
+        # [n_years, 4] growth factors for cash, bonds, stocks, inflation
+        self.factors = 1 + self.df[BENCHMARKS].to_numpy(dtype=float)
+
+    def _rows(self, start_yr, nper):
+        """row slice of the returns earned from start_yr through start_yr + nper - 1"""
+        first = int(start_yr) - self.first_yr
+        if first < 1 or first + nper > len(self.years) or nper < 1:
+            raise ValueError(f"no data for {nper} years starting {start_yr}")
+        return slice(first, first + nper)
+
+    def growth(self, weights, start_yr, nper):
+        """growth of $1 for a batch of allocations
+
+        weights is [n_allocations, 3] (see allocation_weights); returns an
+        [n_allocations, nper + 1] array whose first column is the starting 1.0
+        """
+        factors = self.factors[self._rows(start_yr, nper), :3]
+        weights = np.atleast_2d(weights)
+        out = np.empty((weights.shape[0], nper + 1))
+        out[:, 0] = 1.0
+        np.cumprod(weights @ factors.T, axis=1, out=out[:, 1:])
+        return out
+
+    def benchmark_growth(self, start_yr, nper):
+        """growth of $1 fully invested in cash, bonds, stocks and inflation,
+        as a [4, nper + 1] array
+        """
+        factors = self.factors[self._rows(start_yr, nper)]
+        out = np.empty((len(BENCHMARKS), nper + 1))
+        out[:, 0] = 1.0
+        np.cumprod(factors.T, axis=1, out=out[:, 1:])
+        return out
+
+    def backtest_arrays(self, stocks, cash, start_bal, nper, start_yr):
+        """the backtest as a dict of [nper + 1] arrays: Year, Cash, Bonds,
+        Stocks, Total and the benchmark columns, starting with the year prior
+        to start_yr since data is for year end
+        """
+        rows = self._rows(start_yr, nper)
+        weights = allocation_weights(stocks, cash)
+        total = start_bal * self.growth(weights, start_yr, nper)[0]
+
+        # each asset's balance: last year's total reallocated, then grown
+        holdings = np.empty((nper + 1, 3))
+        holdings[0] = weights[0] * start_bal
+        holdings[1:] = total[:-1, None] * weights[0] * self.factors[rows, :3]
+        out = {"Year": self.years[rows.start - 1 : rows.stop]}
+        for col, values in zip(["Cash", "Bonds", "Stocks"], holdings.T):
+            out[col] = values.round(0)
+        out["Total"] = total.round(0)
+
+        benchmarks = (start_bal * self.benchmark_growth(start_yr, nper)).round(0)
+        out.update(zip(BENCHMARK_COLUMNS, benchmarks))
+        return out
+
+    def backtest(self, stocks, cash, start_bal, nper, start_yr):
+        """calculates the investment returns for user selected asset allocation,
+        rebalanced annually and returns a dataframe with the same columns as the
+        original loop-based backtest
+        """
+        rows = self._rows(start_yr, nper)
+        arrays = self.backtest_arrays(stocks, cash, start_bal, nper, start_yr)
+
+        # include the year prior to start_yr, since data is for year end
+        dff = self.df.iloc[rows.start - 1 : rows.stop].reset_index(drop=True).copy()
+        dff["Year"] = dff["Year"].astype(int)
+        for col in ["Cash", "Bonds", "Stocks", "Total"]:
+            dff[col] = arrays[col]
+        dff["Rebalance"] = True
+        for col in BENCHMARK_COLUMNS:
+            dff[col] = arrays[col]
+        return dff
+
+def _benchmark(df, repeat=1000):
+    """time a single backtest and a batch of every 1% allocation"""
+    engine = BacktestEngine(df)
+    start_yr, nper = engine.first_yr + 1, engine.last_yr - engine.first_yr
+    stocks, cash = np.meshgrid(np.arange(101), np.arange(101))
+    valid = stocks + cash <= 100
+    batch = allocation_weights(stocks[valid], cash[valid])
+    single = batch[:1]
+
+    for label, func in [
+        ("growth, 1 allocation", lambda: engine.growth(single, start_yr, nper)),
+        (f"growth, {len(batch)} allocations", lambda: engine.growth(batch, start_yr, nper)),
+        ("backtest arrays", lambda: engine.backtest_arrays(50, 10, 10000, nper, start_yr)),
+        ("backtest dataframe", lambda: engine.backtest(50, 10, 10000, nper, start_yr)),
+    ]:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = (time.perf_counter() - start) / repeat
+        print(f"{label:<28} {elapsed * 1e6:10.1f} µs")
+
+
+if __name__ == "__main__":
+    historic = pd.read_csv("assets/historic.csv")
+    historic = pd.concat([historic, pd.DataFrame({"Year": [historic.Year.min() - 1]})], ignore_index=True)
+    historic = historic.sort_values("Year", ignore_index=True).fillna(0)
+    _benchmark(historic)
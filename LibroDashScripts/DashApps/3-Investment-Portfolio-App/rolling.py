@@ -0,0 +1,109 @@
+"""
+Rolling statistics over every historical window.
+
+For each window length N and every start year, computes the CAGR, the worst
+and best year, the maximum drawdown and the years it took to recover from
+it. Each window length is one vectorized pass over all start years:
+CAGR from prefix sums of log returns, the rest from
+numpy.lib.stride_tricks.sliding_window_view.
+
+    python rolling.py      # print the best and worst 10-year stock windows
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backtest_engine import BENCHMARKS
+
+STATS = ["cagr", "worst", "worst_year", "best", "best_year", "max_drawdown", "recovery_years"]
+
+
+def window_stats(returns, n, first_yr):
+    """statistics of every n-year window of each series
+
+    returns: [n_series, n_years] yearly returns; first_yr: year of column 0
+    Returns a dict of [n_series, n_years - n + 1] arrays, one per STATS entry,
+    where column i is the window starting in first_yr + i. recovery_years is
+    NaN when the window ends before the drawdown is recovered.
+    """
+    returns = np.atleast_2d(returns)
+    n_starts = returns.shape[1] - n + 1
+    starts = np.arange(n_starts)
+
+    log_prefix = np.zeros((returns.shape[0], returns.shape[1] + 1))
+    np.cumsum(np.log1p(returns), axis=1, out=log_prefix[:, 1:])
+    cagr = np.expm1((log_prefix[:, n:] - log_prefix[:, :-n]) / n)
+
+    # [n_series, n_starts, n]: views, no copies
+    windows = sliding_window_view(returns, n, axis=1)
+    worst_offset = windows.argmin(axis=2)
+    best_offset = windows.argmax(axis=2)
+
+    # growth of $1 inside each window, including the starting 1.0
+    growth = np.ones(windows.shape[:2] + (n + 1,))
+    np.cumprod(1 + windows, axis=2, out=growth[..., 1:])
+    peak = np.maximum.accumulate(growth, axis=2)
+    drawdown = growth / peak - 1
+    trough = drawdown.argmin(axis=2)
+    max_drawdown = np.take_along_axis(drawdown, trough[..., None], 2)[..., 0]
+
+    # first year after the trough where the previous peak is reached again
+    peak_before = np.take_along_axis(peak, trough[..., None], 2)
+    recovered = (growth >= peak_before) & (np.arange(n + 1) > trough[..., None])
+    recovery = np.where(recovered.any(axis=2), recovered.argmax(axis=2) - trough, np.nan)
+    recovery = np.where(max_drawdown < 0, recovery, 0)
+
+    return {
+        "cagr": cagr,
+        "worst": np.take_along_axis(windows, worst_offset[..., None], 2)[..., 0],
+        "worst_year": first_yr + starts + worst_offset,
+        "best": np.take_along_axis(windows, best_offset[..., None], 2)[..., 0],
+        "best_year": first_yr + starts + best_offset,
+        "max_drawdown": max_drawdown,
+        "recovery_years": recovery,
+    }
+
+
+class RollingAnalytics:
+    """window_stats of cash, bonds, stocks and inflation for every window
+    length, so the stats of any (start year, length) are an O(1) lookup
+    """
+
+    def __init__(self, df):
+        """df: the historic table, one row per year, without the added start year"""
+        self.first_yr = int(df["Year"].iloc[0])
+        self.returns = df[BENCHMARKS].to_numpy(dtype=float).T
+        n_years = self.returns.shape[1]
+        # stats[stat] is [n_series, max length, n_years]; NaN where the window
+        # would run past the data
+        self.stats = {stat: np.full((len(BENCHMARKS), n_years + 1, n_years), np.nan) for stat in STATS}
+        for n in range(1, n_years + 1):
+            for stat, values in window_stats(self.returns, n, self.first_yr).items():
+                self.stats[stat][:, n, : values.shape[1]] = values
+
+    def lookup(self, start_yr, n):
+        """{stat: [4] values for cash, bonds, stocks, inflation} of the n-year
+        window starting in start_yr
+        """
+        i = int(start_yr) - self.first_yr
+        return {stat: values[:, n, i] for stat, values in self.stats.items()}
+
+    def by_start_year(self, n):
+        """(start years, {stat: [4, n_starts]}) of every n-year window"""
+        n_starts = self.returns.shape[1] - n + 1
+        years = np.arange(self.first_yr, self.first_yr + n_starts)
+        return years, {stat: values[:, n, :n_starts] for stat, values in self.stats.items()}
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    analytics = RollingAnalytics(pd.read_csv("assets/historic.csv").fillna(0))
+    years, stats = analytics.by_start_year(10)
+    stocks = BENCHMARKS.index("S&P 500")
+    order = np.argsort(stats["cagr"][stocks])
+    for label, i in [("worst", order[0]), ("best", order[-1])]:
+        print(
+            f"{label} 10-year stock window: {years[i]}-{years[i] + 9} "
+            f"CAGR {stats['cagr'][stocks, i]:.1%}, "
+            f"max drawdown {stats['max_drawdown'][stocks, i]:.1%}"
+        )
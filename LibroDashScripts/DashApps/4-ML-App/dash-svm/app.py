@@ -1,55 +1,136 @@
 import time
 import importlib
 
-from dash import Dash, dcc, html, Input, Output, State
-import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn import datasets
-from sklearn.svm import SVC
+from dash import Dash, dcc, html, Input, Output, State, no_update
+import flask
 
 import utils.dash_reusable_components as drc
 import utils.figures as figs
+from utils.jobs import MODELS_DIR, background_manager
+from utils.sweep import C_POWERS, GAMMA_POWERS, run_sweep
+from utils.training import MODEL_CACHE, cache_stats, model_key, train_svm
+from utils.approximate import preview_key, train_preview
+
+# Train in background processes when diskcache is available
+background = background_manager()
+if background is not None and MODEL_CACHE.disk_dir is None:
+    # models are fitted in the job processes and read back by the workers
+    MODEL_CACHE.enable_disk(MODELS_DIR)
+
+# Larger samples only with background training and fast previews
+if background is None:
+    SAMPLE_SIZES = [100, 200, 300, 400, 500]
+else:
+    SAMPLE_SIZES = [100, 1000, 2000, 3000, 4000, 5000]
+
+# Steps reported by train_svm, then the figures
+TRAINING_STEPS = [
+    "Generating data",
+    "Waiting for a free core",
+    "Fitting the SVM",
+    "Scoring the mesh",
+    "Drawing the figures",
+]
 
 app = Dash(
     __name__,
     meta_tags=[
         {"name": "viewport", "content": "width=device-width, initial-scale=1.0"}
     ],
+    # the confusion matrix graph only exists after the first render
+    suppress_callback_exceptions=True,
 )
 app.title = "Support Vector Machine"
 server = app.server
 
 
-def generate_data(n_samples, dataset, noise):
-    if dataset == "moons":
-        return datasets.make_moons(n_samples=n_samples, noise=noise, random_state=0)
+@server.route("/cache-stats")
+def serve_cache_stats():
+    # hit rates and sizes of the dataset and model caches of this worker
+    return flask.jsonify(cache_stats())
 
-    elif dataset == "circles":
-        return datasets.make_circles(
-            n_samples=n_samples, noise=noise, factor=0.5, random_state=1
-        )
 
-    elif dataset == "linear":
-        X, y = datasets.make_classification(
-            n_samples=n_samples,
-            n_features=2,
-            n_redundant=0,
-            n_informative=2,
-            random_state=2,
-            n_clusters_per_class=1,
-        )
+# Inputs that change the trained model; the threshold only re-thresholds it
+MODEL_PARAMETERS = [
+    "dropdown-svm-parameter-kernel",
+    "slider-svm-parameter-degree",
+    "slider-svm-parameter-C-coef",
+    "slider-svm-parameter-C-power",
+    "slider-svm-parameter-gamma-coef",
+    "slider-svm-parameter-gamma-power",
+    "dropdown-select-dataset",
+    "slider-dataset-noise-level",
+    "radio-svm-parameter-shrinking",
+    "slider-dataset-sample-size",
+]
 
-        rng = np.random.RandomState(2)
-        X += noise * rng.uniform(size=X.shape)
-        linearly_separable = (X, y)
 
-        return linearly_separable
+def svm_parameters(
+    kernel,
+    degree,
+    C_coef,
+    C_power,
+    gamma_coef,
+    gamma_power,
+    dataset,
+    noise,
+    shrinking,
+    sample_size,
+):
+    C = C_coef * 10 ** C_power
+    gamma = gamma_coef * 10 ** gamma_power
 
+    if shrinking == "True":
+        flag = True
     else:
-        raise ValueError(
-            "Data type incorrectly specified. Please choose an existing dataset."
-        )
+        flag = False
+
+    return dataset, noise, sample_size, kernel, C, gamma, degree, flag
+
+
+def get_trained_model(*controls, progress=None):
+    return train_svm(*svm_parameters(*controls), progress)
+
+
+def get_shown_model(*controls):
+    # the exact model once it is trained, its fast preview until then, or
+    # None while the background job has not cached either
+    parameters = svm_parameters(*controls)
+    model = MODEL_CACHE.get(model_key(*parameters))
+    if model is None:
+        model = MODEL_CACHE.get(preview_key(*parameters))
+    if model is None and background is None:
+        # without background jobs the graph callback trains in the
+        # foreground too, so refitting an evicted model here is no worse
+        model = train_svm(*parameters)
+    return model
+
+
+# Progress of background training, only shown when it runs in the background
+training_card = [
+    drc.Card(
+        id="training-card",
+        children=[
+            html.P(id="training-status", children="Ready"),
+            html.Progress(
+                id="training-progress", value="0", max=str(len(TRAINING_STEPS))
+            ),
+            html.Button("Cancel Training", id="button-cancel-training", disabled=True),
+            drc.NamedRadioItems(
+                name="Fast Preview",
+                id="radio-fast-preview",
+                labelStyle={"margin-right": "7px", "display": "inline-block"},
+                options=[
+                    {"label": " Enabled", "value": "True"},
+                    {"label": " Disabled", "value": "False"},
+                ],
+                value="True",
+            ),
+        ],
+    )
+]
+if background is None:
+    training_card = []
 
 
 app.layout = html.Div(
@@ -124,12 +205,9 @@ app.layout = html.Div(
                                             name="Sample Size",
                                             id="slider-dataset-sample-size",
                                             min=100,
-                                            max=500,
+                                            max=SAMPLE_SIZES[-1],
                                             step=100,
-                                            marks={
-                                                str(i): str(i)
-                                                for i in [100, 200, 300, 400, 500]
-                                            },
+                                            marks={str(i): str(i) for i in SAMPLE_SIZES},
                                             value=300,
                                         ),
                                         drc.NamedSlider(
@@ -257,9 +335,14 @@ app.layout = html.Div(
                                                 ),
                                             ],
                                         ),
+                                        html.Button(
+                                            "Sweep C and Gamma",
+                                            id="button-sweep",
+                                        ),
                                     ],
                                 ),
-                            ],
+                            ]
+                            + training_card,
                         ),
                         html.Div(
                             id="div-graphs",
@@ -273,7 +356,21 @@ app.layout = html.Div(
                             ),
                         ),
                     ],
-                )
+                ),
+                html.Div(
+                    id="sweep-container",
+                    children=dcc.Loading(
+                        className="graph-wrapper",
+                        children=dcc.Graph(
+                            id="graph-sweep-heatmap",
+                            figure=dict(
+                                layout=dict(
+                                    plot_bgcolor="#282b38", paper_bgcolor="#282b38"
+                                )
+                            ),
+                        ),
+                    ),
+                ),
             ],
         ),
     ]
@@ -301,12 +398,16 @@ def update_slider_svm_parameter_C_coef(power):
 @app.callback(
     Output("slider-threshold", "value"),
     [Input("button-zero-threshold", "n_clicks")],
-    [State("graph-sklearn-svm", "figure")],
+    [State(parameter, "value") for parameter in MODEL_PARAMETERS],
 )
-def reset_threshold_center(n_clicks, figure):
+def reset_threshold_center(n_clicks, *parameters):
     if n_clicks:
-        Z = np.array(figure["data"][0]["z"])
-        value = -Z.min() / (Z.max() - Z.min())
+        model = get_shown_model(*parameters)
+        if model is None:
+            # still training: there is no decision function to center on yet
+            return no_update
+        Z = model.scores.Z
+        value = float(-Z.min() / (Z.max() - Z.min()))
     else:
         value = 0.4959986285375595
     return value
@@ -337,97 +438,29 @@ def disable_slider_param_gamma_power(kernel):
     return kernel not in ["rbf", "poly", "sigmoid"]
 
 
-@app.callback(
-    Output("div-graphs", "children"),
-    [
-        Input("dropdown-svm-parameter-kernel", "value"),
-        Input("slider-svm-parameter-degree", "value"),
-        Input("slider-svm-parameter-C-coef", "value"),
-        Input("slider-svm-parameter-C-power", "value"),
-        Input("slider-svm-parameter-gamma-coef", "value"),
-        Input("slider-svm-parameter-gamma-power", "value"),
-        Input("dropdown-select-dataset", "value"),
-        Input("slider-dataset-noise-level", "value"),
-        Input("radio-svm-parameter-shrinking", "value"),
-        Input("slider-threshold", "value"),
-        Input("slider-dataset-sample-size", "value"),
-    ],
-)
-def update_svm_graph(
-    kernel,
-    degree,
-    C_coef,
-    C_power,
-    gamma_coef,
-    gamma_power,
-    dataset,
-    noise,
-    shrinking,
-    threshold,
-    sample_size,
-):
-    t_start = time.time()
-    h = 0.3  # step size in the mesh
-
-    # Data Pre-processing
-    X, y = generate_data(n_samples=sample_size, dataset=dataset, noise=noise)
-    X = StandardScaler().fit_transform(X)
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.4, random_state=42
-    )
-
-    x_min = X[:, 0].min() - 0.5
-    x_max = X[:, 0].max() + 0.5
-    y_min = X[:, 1].min() - 0.5
-    y_max = X[:, 1].max() + 0.5
-    xx, yy = np.meshgrid(np.arange(x_min, x_max, h), np.arange(y_min, y_max, h))
+def render_graphs(scores, threshold, label):
+    # All three figures read the same decision values
+    prediction_figure = figs.serve_prediction_plot(scores=scores, threshold=threshold)
 
-    C = C_coef * 10 ** C_power
-    gamma = gamma_coef * 10 ** gamma_power
-
-    if shrinking == "True":
-        flag = True
-    else:
-        flag = False
-
-    # Train SVM
-    clf = SVC(C=C, kernel=kernel, degree=degree, gamma=gamma, shrinking=flag)
-    clf.fit(X_train, y_train)
-
-    # Plot the decision boundary. For that, we will assign a color to each
-    # point in the mesh [x_min, x_max]x[y_min, y_max].
-    if hasattr(clf, "decision_function"):
-        Z = clf.decision_function(np.c_[xx.ravel(), yy.ravel()])
-    else:
-        Z = clf.predict_proba(np.c_[xx.ravel(), yy.ravel()])[:, 1]
-
-    prediction_figure = figs.serve_prediction_plot(
-        model=clf,
-        X_train=X_train,
-        X_test=X_test,
-        y_train=y_train,
-        y_test=y_test,
-        Z=Z,
-        xx=xx,
-        yy=yy,
-        mesh_step=h,
-        threshold=threshold,
-    )
-
-    roc_figure = figs.serve_roc_curve(model=clf, X_test=X_test, y_test=y_test)
+    roc_figure = figs.serve_roc_curve(scores=scores)
 
     confusion_figure = figs.serve_pie_confusion_matrix(
-        model=clf, X_test=X_test, y_test=y_test, Z=Z, threshold=threshold
+        scores=scores, threshold=threshold
     )
 
     return [
         html.Div(
             id="svm-graph-container",
-            children=dcc.Loading(
-                className="graph-wrapper",
-                children=dcc.Graph(id="graph-sklearn-svm", figure=prediction_figure),
-                style={"display": "none"},
-            ),
+            children=[
+                html.P(id="model-label", children=label),
+                dcc.Loading(
+                    className="graph-wrapper",
+                    children=dcc.Graph(
+                        id="graph-sklearn-svm", figure=prediction_figure
+                    ),
+                    style={"display": "none"},
+                ),
+            ],
         ),
         html.Div(
             id="graphs-container",
@@ -447,6 +480,178 @@ def update_svm_graph(
     ]
 
 
+def update_svm_graph(set_progress, *controls):
+    *controls, threshold = controls
+
+    def progress(step):
+        set_progress((TRAINING_STEPS.index(step) + 1, step))
+
+    model = get_trained_model(*controls, progress=progress)
+
+    progress("Drawing the figures")
+    label = model.label
+    preview = MODEL_CACHE.get(preview_key(*svm_parameters(*controls)))
+    if preview is not None:
+        difference = preview.scores.test_accuracy() - model.scores.test_accuracy()
+        label += f" (the fast preview's test accuracy was {difference:+.3f} off)"
+
+    return render_graphs(model.scores, threshold, label)
+
+
+if background is None:
+
+    @app.callback(
+        Output("div-graphs", "children"),
+        [Input(parameter, "value") for parameter in MODEL_PARAMETERS],
+        [State("slider-threshold", "value")],
+    )
+    def update_svm_graph_now(*parameters):
+        return update_svm_graph(lambda progress: None, *parameters)
+
+else:
+    # Runs in a process of its own, so a long fit does not hold up a worker.
+    # Dash terminates the job when newer inputs arrive before it is done.
+    app.callback(
+        Output("div-graphs", "children"),
+        [Input(parameter, "value") for parameter in MODEL_PARAMETERS],
+        [State("slider-threshold", "value")],
+        background=True,
+        manager=background,
+        progress=[
+            Output("training-progress", "value"),
+            Output("training-status", "children"),
+        ],
+        running=[
+            (Output("button-cancel-training", "disabled"), False, True),
+            (Output("training-status", "children"), "Starting", "Ready"),
+        ],
+        cancel=[Input("button-cancel-training", "n_clicks")],
+    )(update_svm_graph)
+
+    # Until the exact SVC is back, show an approximate model fitted within
+    # a fixed time budget (see utils/approximate.py)
+    @app.callback(
+        Output("div-graphs", "children", allow_duplicate=True),
+        [Input(parameter, "value") for parameter in MODEL_PARAMETERS],
+        [State("slider-threshold", "value"), State("radio-fast-preview", "value")],
+        prevent_initial_call=True,
+    )
+    def preview_svm_graph(*controls):
+        *controls, threshold, fast_preview = controls
+        parameters = svm_parameters(*controls)
+        if fast_preview != "True" or MODEL_CACHE.get(model_key(*parameters)) is not None:
+            return no_update
+
+        model = train_preview(*parameters)
+        # the exact model may have been drawn while the preview was fitting
+        if MODEL_CACHE.get(model_key(*parameters)) is not None:
+            return no_update
+        label = f"Fast preview: {model.label}. The exact SVC is training..."
+        return render_graphs(model.scores, threshold, label)
+
+
+# Also runs when new graphs are rendered (their model-label appears), so a
+# threshold changed while the model was training is applied to them
+@app.callback(
+    Output("graph-sklearn-svm", "figure"),
+    Output("graph-pie-confusion-matrix", "figure"),
+    [Input("slider-threshold", "value"), Input("model-label", "children")],
+    [State(parameter, "value") for parameter in MODEL_PARAMETERS],
+)
+def update_threshold(threshold, label, *parameters):
+    # the model (or its preview) is cached by the graph callbacks: only the
+    # threshold contour, the accuracies and the confusion matrix change
+    model = get_shown_model(*parameters)
+    if model is None:
+        # training is still running: the threshold is applied to the graphs
+        # it renders
+        return no_update, no_update
+    scores = model.scores
+
+    prediction_patch = figs.serve_threshold_patch(scores=scores, threshold=threshold)
+
+    confusion_figure = figs.serve_pie_confusion_matrix(
+        scores=scores, threshold=threshold
+    )
+
+    return prediction_patch, confusion_figure
+
+
+def sweep_svm(
+    set_progress,
+    n_clicks,
+    kernel,
+    degree,
+    C_coef,
+    C_power,
+    gamma_coef,
+    gamma_power,
+    dataset,
+    noise,
+    shrinking,
+    sample_size,
+):
+    def heatmap(scores):
+        return figs.serve_sweep_heatmap(
+            scores,
+            C_POWERS,
+            GAMMA_POWERS,
+            C_coef,
+            gamma_coef,
+            current=(C_power, gamma_power),
+        )
+
+    scores = run_sweep(
+        dataset,
+        noise,
+        sample_size,
+        kernel,
+        C_coef,
+        gamma_coef,
+        degree,
+        shrinking == "True",
+        on_result=lambda scores: set_progress(heatmap(scores)),
+    )
+    return heatmap(scores)
+
+
+if background is None:
+
+    @app.callback(
+        Output("graph-sweep-heatmap", "figure"),
+        [Input("button-sweep", "n_clicks")],
+        [State(parameter, "value") for parameter in MODEL_PARAMETERS],
+        prevent_initial_call=True,
+    )
+    def sweep_svm_now(*parameters):
+        return sweep_svm(lambda figure: None, *parameters)
+
+else:
+    # Partial heatmaps are sent as progress while the fits come in
+    app.callback(
+        Output("graph-sweep-heatmap", "figure"),
+        [Input("button-sweep", "n_clicks")],
+        [State(parameter, "value") for parameter in MODEL_PARAMETERS],
+        background=True,
+        manager=background,
+        progress=[Output("graph-sweep-heatmap", "figure")],
+        running=[(Output("button-sweep", "disabled"), True, False)],
+        prevent_initial_call=True,
+    )(sweep_svm)
+
+
+@app.callback(
+    Output("slider-svm-parameter-C-power", "value"),
+    Output("slider-svm-parameter-gamma-power", "value"),
+    [Input("graph-sweep-heatmap", "clickData")],
+    prevent_initial_call=True,
+)
+def select_sweep_cell(click_data):
+    # the model of every cell is in the cache after the sweep
+    point = click_data["points"][0]
+    return point["x"], point["y"]
+
+
 # Running the server
 if __name__ == "__main__":
     app.run_server(debug=True)
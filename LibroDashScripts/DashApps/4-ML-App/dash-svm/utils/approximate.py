@@ -0,0 +1,76 @@
+import os
+import time
+import warnings
+
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.kernel_approximation import Nystroem
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import PolynomialFeatures, StandardScaler
+from sklearn.svm import LinearSVC
+
+from utils.training import MODEL_CACHE, TrainedModel, load_data, model_key
+
+# Seconds a fast preview may spend fitting
+FAST_BUDGET = float(os.environ.get("SVM_FAST_BUDGET", 0.2))
+
+
+def approximate_svm(kernel, C, gamma, degree, n_components):
+    """linear SVM on an explicit feature map approximating the kernel"""
+    if kernel == "poly":
+        # the poly kernel's feature space is small in 2D: use it directly
+        features = [PolynomialFeatures(degree), StandardScaler()]
+    elif kernel == "linear":
+        features = []
+    else:
+        features = [
+            Nystroem(
+                kernel=kernel, gamma=gamma, n_components=n_components, random_state=0
+            )
+        ]
+    return make_pipeline(*features, LinearSVC(C=C, max_iter=2000))
+
+
+def fit_preview(dataset, noise, sample_size, kernel, C, gamma, degree, shrinking):
+    """fit an approximate model within FAST_BUDGET seconds and score it
+
+    For Nystroem features the number of components is doubled as long as the
+    next fit is expected to fit in what is left of the budget.
+    """
+    data = load_data(dataset, noise, sample_size)
+    n_train = len(data.X_train)
+    start = time.perf_counter()
+    n_components = min(32, n_train)
+
+    with warnings.catch_warnings():
+        # a preview does not need the last iterations
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        while True:
+            fit_start = time.perf_counter()
+            clf = approximate_svm(kernel, C, gamma, degree, n_components)
+            clf.fit(data.X_train, data.y_train)
+            fit_time = time.perf_counter() - fit_start
+
+            remaining = FAST_BUDGET - (time.perf_counter() - start)
+            if kernel in ["poly", "linear"] or n_components >= n_train:
+                break
+            if 2.5 * fit_time > remaining:
+                break
+            n_components = min(2 * n_components, n_train)
+
+    if kernel == "poly":
+        label = f"degree {degree} polynomial features + linear SVM"
+    elif kernel == "linear":
+        label = "linear SVM"
+    else:
+        label = f"Nystroem ({n_components} components) + linear SVM"
+    return TrainedModel(clf, data, label=label)
+
+
+def preview_key(*parameters):
+    return ("preview",) + model_key(*parameters)
+
+
+def train_preview(dataset, noise, sample_size, kernel, C, gamma, degree, shrinking):
+    """the fast preview of a model, cached like the exact ones"""
+    parameters = (dataset, noise, sample_size, kernel, C, gamma, degree, shrinking)
+    return MODEL_CACHE.get_or_compute(preview_key(*parameters), fit_preview, *parameters)
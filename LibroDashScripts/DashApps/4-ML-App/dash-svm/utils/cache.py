@@ -0,0 +1,143 @@
+import hashlib
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+
+def sizeof(obj, _seen=None):
+    """approximate memory used by obj, following numpy arrays, containers
+    and object attributes (shared objects are counted once)
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            sizeof(k, seen) + sizeof(v, seen) for k, v in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(sizeof(item, seen) for item in obj)
+    if hasattr(obj, "__dict__"):
+        return sys.getsizeof(obj) + sizeof(vars(obj), seen)
+    return sys.getsizeof(obj)
+
+
+class ByteLRUCache:
+    """Least recently used cache bounded by the total size of its values.
+
+    Values that would not fit on their own are returned but not kept. With
+    a disk_dir, values are also written there with joblib and read back on
+    a memory miss, so several gunicorn workers share what any of them has
+    computed.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None, name="cache"):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.name = name
+        self._items = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            self.enable_disk(disk_dir)
+
+    def enable_disk(self, disk_dir):
+        os.makedirs(disk_dir, exist_ok=True)
+        self.disk_dir = disk_dir
+
+    def get(self, key):
+        """the cached value for key, from memory then from disk, or None"""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key][0]
+
+        value = self._read_disk(key)
+        if value is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._store(key, value)
+        return value
+
+    def put(self, key, value):
+        self._write_disk(key, value)
+        self._store(key, value)
+
+    def get_or_compute(self, key, func, *args):
+        """the cached value for key, or func(*args) which is then cached"""
+        value = self.get(key)
+        if value is None:
+            # computed outside the lock: concurrent misses on the same key
+            # may both compute, which is harmless
+            value = func(*args)
+            with self._lock:
+                self.misses += 1
+            self.put(key, value)
+        return value
+
+    def _store(self, key, value):
+        size = sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self.bytes -= self._items.pop(key)[1]
+            self._items[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.disk_dir, f"{self.name}-{digest}.joblib")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            stored_key, value = joblib.load(self._disk_path(key))
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        return value if stored_key == key else None
+
+    def _write_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        # write then rename, so other workers never read a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            joblib.dump((key, value), tmp_path)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # read-only or full disk: keep the memory tier only
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "name": self.name,
+            "items": len(self._items),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
@@ -1,22 +1,36 @@
 import colorlover as cl
+from dash import Patch
 import plotly.graph_objs as go
 import numpy as np
 from sklearn import metrics
 
 
-def serve_prediction_plot(
-    model, X_train, X_test, y_train, y_test, Z, xx, yy, mesh_step, threshold
-):
-    # Get train and test score from model
-    y_pred_train = (model.decision_function(X_train) > threshold).astype(int)
-    y_pred_test = (model.decision_function(X_test) > threshold).astype(int)
-    train_score = metrics.accuracy_score(y_true=y_train, y_pred=y_pred_train)
-    test_score = metrics.accuracy_score(y_true=y_test, y_pred=y_pred_test)
+def scale_threshold(Z, threshold):
+    """map the 0-1 threshold slider onto the range of the mesh decision values"""
+    return threshold * (Z.max() - Z.min()) + Z.min()
+
+
+def threshold_scores(scores, scaled_threshold):
+    """train and test accuracy when predicting 1 above the threshold"""
+    y_pred_train = (scores.decision_train > scaled_threshold).astype(int)
+    y_pred_test = (scores.decision_test > scaled_threshold).astype(int)
+    train_score = metrics.accuracy_score(y_true=scores.y_train, y_pred=y_pred_train)
+    test_score = metrics.accuracy_score(y_true=scores.y_test, y_pred=y_pred_test)
+    return train_score, test_score
+
+
+def serve_prediction_plot(scores, threshold):
+    Z = scores.Z
+    X_train, X_test = scores.X_train, scores.X_test
+    y_train, y_test = scores.y_train, scores.y_test
 
     # Compute threshold
-    scaled_threshold = threshold * (Z.max() - Z.min()) + Z.min()
+    scaled_threshold = scale_threshold(Z, threshold)
     range = max(abs(scaled_threshold - Z.min()), abs(scaled_threshold - Z.max()))
 
+    # Get train and test score from the decision values
+    train_score, test_score = threshold_scores(scores, scaled_threshold)
+
     # Colorscale
     bright_cscale = [[0, "#ff3700"], [1, "#0b8bff"]]
     cscale = [
@@ -31,36 +45,32 @@ def serve_prediction_plot(
     ]
 
     # Create the plot
-    # Plot the prediction contour of the SVM
+    # Plot the prediction contour of the SVM, with the threshold as its only
+    # contour line so that the mesh is sent once
     trace0 = go.Contour(
-        x=np.arange(xx.min(), xx.max(), mesh_step),
-        y=np.arange(yy.min(), yy.max(), mesh_step),
-        z=Z.reshape(xx.shape),
+        x=scores.x,
+        y=scores.y,
+        z=Z,
         zmin=scaled_threshold - range,
         zmax=scaled_threshold + range,
         hoverinfo="none",
         showscale=False,
-        contours=dict(showlines=False),
-        colorscale=cscale,
-        opacity=0.9,
-    )
-
-    # Plot the threshold
-    trace1 = go.Contour(
-        x=np.arange(xx.min(), xx.max(), mesh_step),
-        y=np.arange(yy.min(), yy.max(), mesh_step),
-        z=Z.reshape(xx.shape),
-        showscale=False,
-        hoverinfo="none",
         contours=dict(
-            showlines=False, type="constraint", operation="=", value=scaled_threshold
+            coloring="heatmap",
+            showlines=True,
+            start=scaled_threshold,
+            end=scaled_threshold,
+            size=1,
         ),
+        colorscale=cscale,
+        opacity=0.9,
         name=f"Threshold ({scaled_threshold:.3f})",
+        showlegend=True,
         line=dict(color="#708090"),
     )
 
     # Plot Training Data
-    trace2 = go.Scatter(
+    trace1 = go.Scatter(
         x=X_train[:, 0],
         y=X_train[:, 1],
         mode="markers",
@@ -69,7 +79,7 @@ def serve_prediction_plot(
     )
 
     # Plot Test Data
-    trace3 = go.Scatter(
+    trace2 = go.Scatter(
         x=X_test[:, 0],
         y=X_test[:, 1],
         mode="markers",
@@ -90,18 +100,37 @@ def serve_prediction_plot(
         font={"color": "#a5b1cd"},
     )
 
-    data = [trace0, trace1, trace2, trace3]
+    data = [trace0, trace1, trace2]
     figure = go.Figure(data=data, layout=layout)
 
     return figure
 
 
-def serve_roc_curve(model, X_test, y_test):
-    decision_test = model.decision_function(X_test)
-    fpr, tpr, threshold = metrics.roc_curve(y_test, decision_test)
+def serve_threshold_patch(scores, threshold):
+    """Patch for a figure made by serve_prediction_plot that only moves the
+    threshold: the mesh itself is not sent again
+    """
+    Z = scores.Z
+    scaled_threshold = scale_threshold(Z, threshold)
+    range = max(abs(scaled_threshold - Z.min()), abs(scaled_threshold - Z.max()))
+    train_score, test_score = threshold_scores(scores, scaled_threshold)
+
+    patch = Patch()
+    patch["data"][0]["zmin"] = scaled_threshold - range
+    patch["data"][0]["zmax"] = scaled_threshold + range
+    patch["data"][0]["contours"]["start"] = scaled_threshold
+    patch["data"][0]["contours"]["end"] = scaled_threshold
+    patch["data"][0]["name"] = f"Threshold ({scaled_threshold:.3f})"
+    patch["data"][1]["name"] = f"Training Data (accuracy={train_score:.3f})"
+    patch["data"][2]["name"] = f"Test Data (accuracy={test_score:.3f})"
+    return patch
+
+
+def serve_roc_curve(scores):
+    fpr, tpr, threshold = metrics.roc_curve(scores.y_test, scores.decision_test)
 
     # AUC Score
-    auc_score = metrics.roc_auc_score(y_true=y_test, y_score=decision_test)
+    auc_score = metrics.roc_auc_score(y_true=scores.y_test, y_score=scores.decision_test)
 
     trace0 = go.Scatter(
         x=fpr, y=tpr, mode="lines", name="Test Data", marker={"color": "#13c6e9"}
@@ -124,12 +153,12 @@ def serve_roc_curve(model, X_test, y_test):
     return figure
 
 
-def serve_pie_confusion_matrix(model, X_test, y_test, Z, threshold):
+def serve_pie_confusion_matrix(scores, threshold):
     # Compute threshold
-    scaled_threshold = threshold * (Z.max() - Z.min()) + Z.min()
-    y_pred_test = (model.decision_function(X_test) > scaled_threshold).astype(int)
+    scaled_threshold = scale_threshold(scores.Z, threshold)
+    y_pred_test = (scores.decision_test > scaled_threshold).astype(int)
 
-    matrix = metrics.confusion_matrix(y_true=y_test, y_pred=y_pred_test)
+    matrix = metrics.confusion_matrix(y_true=scores.y_test, y_pred=y_pred_test)
     tn, fp, fn, tp = matrix.ravel()
 
     values = [tp, fn, fp, tn]
@@ -164,3 +193,50 @@ def serve_pie_confusion_matrix(model, X_test, y_test, Z, threshold):
     figure = go.Figure(data=data, layout=layout)
 
     return figure
+
+
+def serve_sweep_heatmap(scores, C_powers, gamma_powers, C_coef, gamma_coef, current):
+    """test accuracy over the C and gamma grid; current is the (C power,
+    gamma power) of the model shown above
+    """
+    C_labels = [str(round(C_coef * 10 ** power, 8)) for power in C_powers]
+    gamma_labels = [str(round(gamma_coef * 10 ** power, 8)) for power in gamma_powers]
+
+    trace0 = go.Heatmap(
+        x=C_powers,
+        y=gamma_powers,
+        z=scores,
+        zmin=0.5,
+        zmax=1,
+        colorscale="Blues",
+        colorbar=dict(title="Test Accuracy"),
+        text=[[f"{score:.3f}" if score == score else "" for score in row] for row in scores],
+        texttemplate="%{text}",
+        hovertemplate="C %{x}, gamma %{y}: %{z:.3f}<extra></extra>",
+    )
+
+    # Mark the parameters currently shown
+    trace1 = go.Scatter(
+        x=[current[0]],
+        y=[current[1]],
+        mode="markers",
+        marker=dict(symbol="square-open", size=40, color="#ff916d", line=dict(width=3)),
+        hoverinfo="skip",
+        showlegend=False,
+    )
+
+    done = int(np.sum(~np.isnan(scores)))
+    layout = go.Layout(
+        title=f"Test Accuracy over C and Gamma ({done}/{scores.size}) - click a cell to show it",
+        xaxis=dict(title="Cost (C)", tickvals=C_powers, ticktext=C_labels),
+        yaxis=dict(title="Gamma", tickvals=gamma_powers, ticktext=gamma_labels),
+        margin=dict(l=100, r=10, t=50, b=50),
+        plot_bgcolor="#282b38",
+        paper_bgcolor="#282b38",
+        font={"color": "#a5b1cd"},
+    )
+
+    data = [trace0, trace1]
+    figure = go.Figure(data=data, layout=layout)
+
+    return figure
@@ -0,0 +1,86 @@
+import contextlib
+import os
+import time
+import uuid
+
+try:
+    import diskcache
+    import psutil  # installed with dash[diskcache], which uses it to kill jobs
+    from dash import DiskcacheManager
+except ImportError:  # dash[diskcache] not installed: train inside the request
+    diskcache = None
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JOBS_DIR = os.environ.get("SVM_JOBS_DIR", os.path.join(APP_DIR, "cache", "jobs"))
+# Fitted models are handed from the job processes to the workers through here
+MODELS_DIR = os.environ.get("SVM_CACHE_DIR", os.path.join(APP_DIR, "cache", "models"))
+# Fits running at the same time, over all workers and jobs
+FIT_SLOTS = int(os.environ.get("SVM_FIT_SLOTS", os.cpu_count() or 1))
+# Backstop for a lease whose holder cannot be checked (e.g. a reused pid)
+LEASE_TTL = 3600
+
+_cache = None
+
+
+def background_manager():
+    """DiskcacheManager running training callbacks in their own processes, or
+    None when diskcache is missing or SVM_BACKGROUND=0
+    """
+    global _cache
+    if diskcache is None or os.environ.get("SVM_BACKGROUND", "1") == "0":
+        return None
+    _cache = diskcache.Cache(JOBS_DIR)
+    return DiskcacheManager(_cache)
+
+
+def _holder_alive(pid):
+    try:
+        return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+
+
+class FitSlot:
+    """One of the FIT_SLOTS leases, held while fitting.
+
+    Each slot is a key of its own in the jobs cache holding the pid of the
+    job using it. Dash cancels stale jobs with SIGKILL, so a job may die
+    without releasing its slot: a slot whose process is gone counts as free.
+    """
+
+    def __init__(self, cache, slots=FIT_SLOTS, poll=0.1):
+        self.cache = cache
+        self.slots = slots
+        self.poll = poll
+        self.key = None
+        self.token = None
+
+    def __enter__(self):
+        self.token = (os.getpid(), uuid.uuid4().hex)
+        while True:
+            with self.cache.transact():
+                for i in range(self.slots):
+                    key = f"svm-fit-slot-{i}"
+                    holder = self.cache.get(key)
+                    if holder is None or not _holder_alive(holder[0]):
+                        self.cache.set(key, self.token, expire=LEASE_TTL)
+                        self.key = key
+                        return self
+            time.sleep(self.poll)
+
+    def __exit__(self, *exc_info):
+        with self.cache.transact():
+            # the slot may have been taken over if it outlived LEASE_TTL
+            if self.cache.get(self.key) == self.token:
+                self.cache.delete(self.key)
+
+
+def fit_slot():
+    """Wait for one of the FIT_SLOTS before fitting.
+
+    Every background job is a process of its own, so without this a burst of
+    slider moves would start as many fits as there are requests.
+    """
+    if _cache is None:
+        return contextlib.nullcontext()
+    return FitSlot(_cache)
@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+
+# Target number of mesh points, whatever the extent of the data
+MESH_CELLS = int(os.environ.get("SVM_MESH_CELLS", 4000))
+
+
+def mesh_axes(x_range, y_range, cells=MESH_CELLS):
+    """x and y coordinates of a square-celled mesh of about `cells` points"""
+    (x_min, x_max), (y_min, y_max) = x_range, y_range
+    h = np.sqrt((x_max - x_min) * (y_max - y_min) / cells)
+    x = np.linspace(x_min, x_max, max(2, int(round((x_max - x_min) / h)) + 1))
+    y = np.linspace(y_min, y_max, max(2, int(round((y_max - y_min) / h)) + 1))
+    return x, y
+
+
+def _coarse_index(n, factor):
+    """every factor-th index of an axis of n points, always including the last"""
+    return np.unique(np.r_[np.arange(0, n, factor), n - 1])
+
+
+def _interpolate(values, index, n, axis):
+    """linear interpolation of values known at `index` to all n points of axis"""
+    position = np.arange(n)
+    upper = np.clip(np.searchsorted(index, position, side="right"), 1, len(index) - 1)
+    lower = upper - 1
+    weight = (position - index[lower]) / (index[upper] - index[lower])
+    shape = [1, 1]
+    shape[axis] = n
+    weight = weight.reshape(shape)
+    return (1 - weight) * np.take(values, lower, axis=axis) + weight * np.take(
+        values, upper, axis=axis
+    )
+
+
+def adaptive_mesh(
+    decision_function, x_range, y_range, cells=MESH_CELLS, factor=4, tolerance=0.02
+):
+    """decision values over a mesh of about `cells` points, evaluated exactly
+    only where it matters
+
+    A coarse pass evaluates every factor-th point (and the center of each
+    coarse cell) and interpolates the rest. Coarse cells where the decision
+    value changes sign, or where the center is more than `tolerance` (as a
+    fraction of the value range) away from the interpolation, are evaluated
+    again at full resolution.
+
+    Returns x [nx], y [ny], Z [ny, nx] as float32 and the number of points
+    that were evaluated.
+    """
+    x, y = mesh_axes(x_range, y_range, cells)
+    nx, ny = len(x), len(y)
+    xi, yi = _coarse_index(nx, factor), _coarse_index(ny, factor)
+
+    def evaluate(rows, cols):
+        return decision_function(np.c_[x[cols], y[rows]])
+
+    # coarse pass, interpolated to the full mesh
+    rows, cols = np.meshgrid(yi, xi, indexing="ij")
+    coarse = evaluate(rows.ravel(), cols.ravel()).reshape(rows.shape)
+    Z = _interpolate(_interpolate(coarse, xi, nx, axis=1), yi, ny, axis=0)
+
+    # exact values at the center of every coarse cell
+    center_rows = (yi[:-1] + yi[1:]) // 2
+    center_cols = (xi[:-1] + xi[1:]) // 2
+    rows, cols = np.meshgrid(center_rows, center_cols, indexing="ij")
+    center = evaluate(rows.ravel(), cols.ravel()).reshape(rows.shape)
+    error = np.abs(center - Z[rows, cols])
+    Z[rows, cols] = center
+
+    corners = np.stack(
+        [coarse[:-1, :-1], coarse[:-1, 1:], coarse[1:, :-1], coarse[1:, 1:], center]
+    )
+    sign_change = (corners.min(axis=0) < 0) & (corners.max(axis=0) > 0)
+    value_range = max(coarse.max() - coarse.min(), 1e-12)
+    refine = sign_change | (error > tolerance * value_range)
+
+    # full resolution inside the flagged cells
+    mask = np.zeros((ny, nx), dtype=bool)
+    for row, col in zip(*np.nonzero(refine)):
+        mask[yi[row] : yi[row + 1] + 1, xi[col] : xi[col + 1] + 1] = True
+    rows, cols = np.nonzero(mask)
+    if len(rows):
+        Z[rows, cols] = evaluate(rows, cols)
+
+    evaluated = coarse.size + center.size + len(rows)
+    return x, y, Z.astype(np.float32), evaluated
@@ -0,0 +1,81 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from utils.training import MODEL_CACHE, fit_model, load_data, model_key
+
+# Same ranges as the C and gamma power sliders
+C_POWERS = list(range(-2, 5))
+GAMMA_POWERS = list(range(-5, 1))
+
+
+def run_sweep(
+    dataset,
+    noise,
+    sample_size,
+    kernel,
+    C_coef,
+    gamma_coef,
+    degree,
+    shrinking,
+    on_result=None,
+    processes=None,
+):
+    """test accuracy for every C_coef * 10 ** C_power and
+    gamma_coef * 10 ** gamma_power, as a [len(GAMMA_POWERS), len(C_POWERS)]
+    array
+
+    Models already in the model cache are reused, the others are fitted in a
+    process pool and added to it, so picking a cell afterwards is a cache
+    hit. on_result(scores) is called with the partial grid every time a fit
+    finishes (cells not done yet are NaN).
+    """
+    # grid cells sharing a model (e.g. every gamma with a linear kernel)
+    # are fitted once
+    cells = {}
+    for row, gamma_power in enumerate(GAMMA_POWERS):
+        for col, C_power in enumerate(C_POWERS):
+            parameters = (
+                dataset,
+                noise,
+                sample_size,
+                kernel,
+                C_coef * 10 ** C_power,
+                gamma_coef * 10 ** gamma_power,
+                degree,
+                shrinking,
+            )
+            key = model_key(*parameters)
+            cells.setdefault(key, (parameters, []))[1].append((row, col))
+
+    scores = np.full((len(GAMMA_POWERS), len(C_POWERS)), np.nan)
+
+    def record(key, model):
+        for row, col in cells[key][1]:
+            scores[row, col] = model.scores.test_accuracy()
+        if on_result:
+            on_result(scores)
+
+    to_fit = []
+    for key, (parameters, _) in cells.items():
+        model = MODEL_CACHE.get(key)
+        if model is None:
+            to_fit.append(key)
+        else:
+            record(key, model)
+
+    if to_fit:
+        # generate the data before starting the pool: forked workers then
+        # share it with this process instead of receiving a copy per fit
+        load_data(dataset, noise, sample_size)
+        processes = processes or min(len(to_fit), os.cpu_count() or 1)
+        with ProcessPoolExecutor(processes) as pool:
+            futures = {pool.submit(fit_model, *cells[key][0]): key for key in to_fit}
+            for future in as_completed(futures):
+                key = futures[future]
+                model = future.result()
+                MODEL_CACHE.put(key, model)
+                record(key, model)
+
+    return scores
@@ -0,0 +1,170 @@
+import os
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn import datasets
+from sklearn.svm import SVC
+
+from utils.cache import ByteLRUCache
+from utils.jobs import fit_slot
+from utils.mesh import adaptive_mesh
+
+# Generated datasets, keyed by (dataset, noise, sample size)
+DATA_CACHE = ByteLRUCache(
+    max_bytes=int(os.environ.get("SVM_DATA_CACHE_MB", 16)) * 2 ** 20, name="datasets"
+)
+# Fitted models with their mesh scores, keyed by every parameter. Set
+# SVM_CACHE_DIR to share them between gunicorn workers through the disk.
+MODEL_CACHE = ByteLRUCache(
+    max_bytes=int(os.environ.get("SVM_MODEL_CACHE_MB", 64)) * 2 ** 20,
+    disk_dir=os.environ.get("SVM_CACHE_DIR"),
+    name="models",
+)
+
+
+def generate_data(n_samples, dataset, noise):
+    if dataset == "moons":
+        return datasets.make_moons(n_samples=n_samples, noise=noise, random_state=0)
+
+    elif dataset == "circles":
+        return datasets.make_circles(
+            n_samples=n_samples, noise=noise, factor=0.5, random_state=1
+        )
+
+    elif dataset == "linear":
+        X, y = datasets.make_classification(
+            n_samples=n_samples,
+            n_features=2,
+            n_redundant=0,
+            n_informative=2,
+            random_state=2,
+            n_clusters_per_class=1,
+        )
+
+        rng = np.random.RandomState(2)
+        X += noise * rng.uniform(size=X.shape)
+        linearly_separable = (X, y)
+
+        return linearly_separable
+
+    else:
+        raise ValueError(
+            "Data type incorrectly specified. Please choose an existing dataset."
+        )
+
+
+class Dataset:
+    """A generated dataset, scaled and split, and the extent of the mesh
+    covering it
+    """
+
+    def __init__(self, dataset, noise, sample_size):
+        # Data Pre-processing
+        X, y = generate_data(n_samples=sample_size, dataset=dataset, noise=noise)
+        X = StandardScaler().fit_transform(X)
+        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
+            X, y, test_size=0.4, random_state=42
+        )
+
+        self.x_range = (X[:, 0].min() - 0.5, X[:, 0].max() + 0.5)
+        self.y_range = (X[:, 1].min() - 0.5, X[:, 1].max() + 0.5)
+
+
+class ScoringBundle:
+    """Decision values of a fitted model over the mesh and the train and test
+    data. Computed once per model and shared by all the figures, so the
+    kernel is never evaluated twice on the same points.
+    """
+
+    def __init__(self, decision_function, data, progress=None):
+        self.X_train, self.X_test = data.X_train, data.X_test
+        self.y_train, self.y_test = data.y_train, data.y_test
+
+        # Assign a decision value to each point in the mesh
+        # [x_min, x_max]x[y_min, y_max], Z[i, j] being at (x[j], y[i]),
+        # and to the train and test data
+        if progress:
+            progress("Scoring the mesh")
+        self.x, self.y, self.Z, self.mesh_evaluations = adaptive_mesh(
+            decision_function, data.x_range, data.y_range
+        )
+        decision = decision_function(np.r_[self.X_train, self.X_test])
+        self.decision_train = decision[: len(self.X_train)]
+        self.decision_test = decision[len(self.X_train) :]
+
+    def test_accuracy(self):
+        """accuracy on the test data at the default threshold of 0"""
+        return float(np.mean((self.decision_test > 0) == self.y_test))
+
+
+class TrainedModel:
+    """Everything that depends on the dataset and the SVM parameters but not
+    on the threshold: the fitted model, what kind of model it is and its
+    scores.
+    """
+
+    def __init__(self, clf, data, progress=None, label="Exact SVC"):
+        self.clf = clf
+        self.label = label
+        self.scores = ScoringBundle(clf.decision_function, data, progress)
+
+
+def load_data(dataset, noise, sample_size):
+    """the scaled and split dataset, generated once per (dataset, noise, size)"""
+    key = (dataset, float(noise), int(sample_size))
+    return DATA_CACHE.get_or_compute(key, Dataset, dataset, noise, sample_size)
+
+
+def model_key(dataset, noise, sample_size, kernel, C, gamma, degree, shrinking):
+    """cache key of a model; parameters the kernel ignores are left out, so
+    e.g. moving the degree slider with an rbf kernel reuses the same model
+    """
+    return (
+        dataset,
+        float(noise),
+        int(sample_size),
+        kernel,
+        float(C),
+        float(gamma) if kernel in ["rbf", "poly", "sigmoid"] else None,
+        int(degree) if kernel == "poly" else None,
+        bool(shrinking),
+    )
+
+
+def fit_model(
+    dataset, noise, sample_size, kernel, C, gamma, degree, shrinking, progress=None
+):
+    if progress:
+        progress("Generating data")
+    data = load_data(dataset, noise, sample_size)
+
+    # Train SVM
+    if progress:
+        progress("Waiting for a free core")
+    with fit_slot():
+        if progress:
+            progress("Fitting the SVM")
+        clf = SVC(C=C, kernel=kernel, degree=degree, gamma=gamma, shrinking=shrinking)
+        clf.fit(data.X_train, data.y_train)
+
+    return TrainedModel(clf, data, progress)
+
+
+def train_svm(
+    dataset, noise, sample_size, kernel, C, gamma, degree, shrinking, progress=None
+):
+    """generate the data, fit the SVM and score the mesh
+
+    Cached on the parameters, so moving the threshold (or coming back to
+    parameters seen before) does not retrain. progress, if given, is called
+    with the name of each step.
+    """
+    parameters = (dataset, noise, sample_size, kernel, C, gamma, degree, shrinking)
+    return MODEL_CACHE.get_or_compute(
+        model_key(*parameters), fit_model, *parameters, progress
+    )
+
+
+def cache_stats():
+    return [DATA_CACHE.stats(), MODEL_CACHE.stats()]
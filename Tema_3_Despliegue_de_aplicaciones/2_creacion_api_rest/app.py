@@ -1,14 +1,37 @@
-from flask import Flask
+import json
+
+from flask import Flask, Response, request, stream_with_context
 from flask_restful import Api, Resource, reqparse, abort
 import transformers
-from datetime import datetime
+
+from batching import BatchScheduler
+from prediction_cache import PredictionCache
+from bulk import classify_window, iter_json_array, iter_ndjson
+from review_store import ReviewStore, review_row
 
 app = Flask(__name__)
 api = Api(app)
 
 # Modelo con un transformer de Hugging Face 
-classifier = transformers.pipeline(
-    'sentiment-analysis', model = "nlptown/bert-base-multilingual-uncased-sentiment")
+MODEL = "nlptown/bert-base-multilingual-uncased-sentiment"
+classifier = transformers.pipeline('sentiment-analysis', model = MODEL)
+
+# Las peticiones que llegan a la vez se clasifican juntas, en un único lote
+# con padding, desde un hilo dedicado (ver batching.py)
+scheduler = BatchScheduler(
+    lambda texts: classifier(texts, batch_size=len(texts), padding=True, truncation=True))
+
+# Las opiniones ya clasificadas no vuelven a pasar por el modelo (ver
+# prediction_cache.py)
+cache = PredictionCache(MODEL)
+
+
+def submit(text):
+    return cache.get_or_submit(text, scheduler.submit)
+
+
+def classify(text):
+    return submit(text).result(timeout=60)
 
 # Agregar parametros para las reviews
 reviews_args = reqparse.RequestParser()
@@ -16,40 +39,101 @@ reviews_args.add_argument("name", type=str, required=True)
 reviews_args.add_argument("review", type=str, required=True)
 reviews_args.add_argument("rating", type=int, required = False)
 
-reviews = {}
+# Filtros y cursor del listado de GET /sentiment/0
+list_args = reqparse.RequestParser()
+list_args.add_argument("after", type=str, location="args")
+list_args.add_argument("limit", type=int, default=100, location="args")
+list_args.add_argument("prediction", type=str, location="args")
+list_args.add_argument("since", type=str, location="args")
+list_args.add_argument("until", type=str, location="args")
+
+# Las opiniones se guardan en SQLite (ver review_store.py)
+reviews = ReviewStore()
 
-def reviews_error(review_id):
-    if review_id not in reviews:
+def reviews_error(review):
+    if review is None:
         abort(404, message = "No existe la opinión que estás buscando")
+    return review
 
 class SentimentAnalysis(Resource):
     
     def get(self,review_id=0):
         if review_id != 0: 
-            reviews_error(review_id)
-            return reviews[review_id]
+            return reviews_error(reviews.get(review_id))
         else:
-            return reviews
+            # una página de opiniones y el cursor de la siguiente
+            args = list_args.parse_args()
+            try:
+                page, cursor = reviews.list(**args)
+            except ValueError:
+                abort(400, message = "El cursor after no es válido")
+            return {"reviews": page, "next": cursor}
 
     def put(self, review_id):
         args = reviews_args.parse_args()
-        reviews[review_id] = args
-        text = reviews[review_id]["review"]
-        sentiment = classifier(text)[0]
-        reviews[review_id]['prediction'] = sentiment['label'].split()[0]
-        reviews[review_id]['probability'] = sentiment['score']
-        reviews[review_id]["timestamp"] = str(datetime.now())
-        return reviews[review_id], 201
+        sentiment = classify(args["review"])
+        return reviews.save(review_row(review_id, args, sentiment)), 201
 
     def post(self, review_id):
         pass
     
     def delete(self, review_id):
-        reviews_error(review_id)
-        del reviews[review_id]
+        if not reviews.delete(review_id):
+            reviews_error(None)
         return 'La review con id {} ha sido eliminada'.format(review_id), 204
 
+# Campos de cada opinión en la respuesta de /sentiment/bulk
+BULK_FIELDS = ["id", "prediction", "probability", "timestamp"]
+
+class BulkSentiment(Resource):
+
+    def post(self):
+        # Un array JSON o NDJSON (application/x-ndjson) con id, name, review y
+        # rating opcional por opinión. Se responde en NDJSON, una línea por
+        # opinión y en el mismo orden, a medida que se van clasificando. Las
+        # líneas no repiten el texto de la opinión: así la respuesta que se
+        # acumula mientras el cliente aún está subiendo es pequeña.
+        if request.mimetype == "application/x-ndjson":
+            items = iter_ndjson(request.stream)
+        else:
+            items = iter_json_array(request.stream)
+
+        def results():
+            # las opiniones clasificadas se guardan y se envían juntas, en una
+            # transacción, cada 256 o antes de quedarse esperando al modelo
+            lines, rows = [], []
+            for review_id, args, future in classify_window(items, submit):
+                waiting = not isinstance(future, str) and not future.done()
+                if lines and (len(lines) >= 256 or waiting):
+                    reviews.save_many(rows)
+                    yield "".join(json.dumps(line) + "\n" for line in lines)
+                    lines, rows = [], []
+                if isinstance(future, str):
+                    lines.append({"id": review_id, "error": future})
+                    continue
+                try:
+                    sentiment = future.result(timeout=60)
+                except Exception as error:
+                    # un fallo del modelo (o que tarde demasiado) solo afecta a
+                    # esta opinión: se informa en su línea y se sigue
+                    lines.append({"id": review_id, "error": f"No se pudo clasificar: {error!r}"})
+                    continue
+                rows.append(review_row(review_id, args, sentiment))
+                lines.append({field: rows[-1][field] for field in BULK_FIELDS})
+            if lines:
+                reviews.save_many(rows)
+                yield "".join(json.dumps(line) + "\n" for line in lines)
+
+        return Response(stream_with_context(results()), mimetype="application/x-ndjson")
+
+class Metrics(Resource):
+
+    def get(self):
+        return {**scheduler.metrics(), "cache": cache.metrics()}
+
 api.add_resource(SentimentAnalysis, "/sentiment/<int:review_id>")
+api.add_resource(BulkSentiment, "/sentiment/bulk")
+api.add_resource(Metrics, "/metrics")
 
 if __name__ == "__main__":
     app.run(debug = True)
@@ -0,0 +1,114 @@
+"""
+Planificador que agrupa las peticiones de clasificación en lotes.
+
+Cada petición deja su texto en una cola y espera un Future. Un hilo dedicado
+recoge textos hasta tener MAX_BATCH o hasta que el primero lleva MAX_WAIT_MS
+esperando, los pasa juntos por el modelo (un único forward con padding) y
+resuelve el Future de cada petición con su resultado.
+"""
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future
+
+MAX_BATCH = int(os.environ.get("SENTIMENT_MAX_BATCH", 16))
+MAX_WAIT_MS = float(os.environ.get("SENTIMENT_MAX_WAIT_MS", 10))
+
+
+class Histogram:
+    """cuenta de observaciones por intervalos, como los histogramas de Prometheus"""
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            buckets = {f"<={b}": c for b, c in zip(self.bounds, self.counts)}
+            buckets["+inf"] = self.counts[-1]
+            return {
+                "count": self.count,
+                "mean": self.total / self.count if self.count else None,
+                "buckets": buckets,
+            }
+
+
+class BatchScheduler:
+    def __init__(self, predict, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        """predict: función que recibe una lista de textos y devuelve una lista
+        con el resultado de cada uno, en el mismo orden
+        """
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        # tamaño de cada lote, y en milisegundos: lo que espera cada texto en
+        # la cola y lo que tarda el modelo con cada lote
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64])
+        self.queue_ms = Histogram([1, 5, 10, 25, 50, 100, 250, 1000])
+        self.inference_ms = Histogram([5, 10, 25, 50, 100, 250, 500, 1000, 5000])
+        self.worker = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self.worker.start()
+
+    def submit(self, text):
+        """Future con el resultado de text"""
+        future = Future()
+        self.queue.put((text, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        """espera un texto y junta los que lleguen antes de llenar el lote o
+        de que el primero lleve max_wait esperando
+        """
+        batch = [self.queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self.queue.get(timeout=remaining))
+                else:
+                    # pasado el plazo solo se añade lo que ya está en la cola
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            for _, _, queued in batch:
+                self.queue_ms.observe((start - queued) * 1000)
+            self.batch_sizes.observe(len(batch))
+            try:
+                results = self.predict([text for text, _, _ in batch])
+            except Exception as error:
+                for _, future, _ in batch:
+                    future.set_exception(error)
+                continue
+            finally:
+                self.inference_ms.observe((time.perf_counter() - start) * 1000)
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def metrics(self):
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self.queue.qsize(),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_ms": self.queue_ms.snapshot(),
+            "inference_ms": self.inference_ms.snapshot(),
+        }
@@ -0,0 +1,138 @@
+"""
+Lectura incremental de las subidas masivas y clasificación en ventana.
+
+Las opiniones se leen del cuerpo de la petición a medida que llegan, ya sea un
+array JSON o NDJSON (un objeto JSON por línea), y se mandan a clasificar sin
+esperar al resto. Como mucho hay BULK_WINDOW opiniones pendientes a la vez:
+la memoria no depende del tamaño de la subida. Los resultados salen en el
+mismo orden en que llegaron.
+"""
+import codecs
+import json
+import os
+import re
+from collections import deque
+
+BULK_WINDOW = int(os.environ.get("SENTIMENT_BULK_WINDOW", 256))
+CHUNK_SIZE = 64 * 1024
+# Tamaño máximo de una opinión en la subida
+MAX_ITEM_SIZE = 1024 * 1024
+SEPARATORS = re.compile(r"[ \t\r\n,]*")
+
+
+class BulkError(ValueError):
+    """el cuerpo de la petición no se puede seguir leyendo"""
+
+
+def iter_json_array(stream):
+    """objetos de un array JSON, leídos de stream por trozos"""
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    # buffer[pos:] es lo que queda por leer: se avanza pos en vez de recortar
+    # buffer en cada opinión, que copiaría el resto del trozo cada vez
+    buffer, pos, started = "", 0, False
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        buffer = buffer[pos:] + text.decode(chunk, final=not chunk)
+        pos = 0
+        while True:
+            pos = skip_separators(buffer, pos)
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise BulkError("Se esperaba un array JSON")
+                pos, started = pos + 1, True
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if len(buffer) - pos > MAX_ITEM_SIZE:
+                    raise BulkError("El array JSON no es válido")
+                break  # valor a medias: leer más
+            if end == len(buffer) and chunk:
+                break  # un número puede seguir en el siguiente trozo
+            pos = end
+            yield item
+        if not chunk:
+            raise BulkError("El array JSON está incompleto o no es válido")
+
+
+def skip_separators(buffer, pos):
+    """posición del primer carácter de buffer[pos:] que no es un espacio ni una coma"""
+    match = SEPARATORS.match(buffer, pos)
+    return match.end()
+
+
+def iter_ndjson(stream):
+    """objetos de un NDJSON; las líneas que no son JSON, o que pasan de
+    MAX_ITEM_SIZE, dan un BulkError
+    """
+    number = 0
+    while True:
+        # con límite: una línea enorme sin salto no se guarda entera
+        line = stream.readline(MAX_ITEM_SIZE + 1)
+        if not line:
+            return
+        number += 1
+        if len(line) > MAX_ITEM_SIZE and not line.endswith(b"\n"):
+            # se descarta el resto de la línea, también por trozos
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(MAX_ITEM_SIZE + 1)
+            yield BulkError(f"La línea {number} es demasiado larga")
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield BulkError(f"La línea {number} no es JSON válido")
+
+
+def validate(item):
+    """(review_id, args) de una opinión, o un mensaje de error"""
+    if isinstance(item, BulkError):
+        return str(item)
+    if not isinstance(item, dict):
+        return "Cada opinión debe ser un objeto JSON"
+    review_id = item.get("id")
+    if not isinstance(review_id, int) or isinstance(review_id, bool):
+        return "Falta el id entero de la opinión"
+    for field in ["name", "review"]:
+        if not isinstance(item.get(field), str):
+            return f"Falta el campo {field}"
+    rating = item.get("rating")
+    if rating is not None and not isinstance(rating, int):
+        return "rating debe ser un entero"
+    return review_id, {"name": item["name"], "review": item["review"], "rating": rating}
+
+
+def classify_window(items, submit, window=BULK_WINDOW):
+    """(review_id, args, future o mensaje de error) de cada opinión, en orden,
+    con a lo sumo window opiniones pendientes
+    """
+    pending = deque()
+    done = object()
+    while True:
+        try:
+            item = next(items, done)
+        except BulkError as error:
+            # se devuelve lo pendiente y después el error
+            pending.append((None, None, str(error)))
+            break
+        if item is done:
+            break
+        checked = validate(item)
+        if isinstance(checked, str):
+            review_id = item.get("id") if isinstance(item, dict) else None
+            pending.append((review_id, None, checked))
+        else:
+            review_id, args = checked
+            pending.append((review_id, args, submit(args["review"])))
+        while len(pending) >= window:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
@@ -0,0 +1,90 @@
+"""
+Cliente de la API de análisis de sentimiento.
+
+Todas las llamadas van por una misma sesión de requests, que reutiliza la
+conexión en vez de abrir una nueva por petición.
+
+    api = SentimentClient()
+    api.put(1, "Carlos", "El sitio es maravilloso")
+    for result in api.classify_bulk(opiniones):  # dicts con id, name, review
+        print(result)
+"""
+import itertools
+import json
+
+import requests
+
+BASE = "http://127.0.0.1:5000/"
+
+
+class SentimentClient:
+    def __init__(self, base_url=BASE):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+
+    def _url(self, path):
+        return f"{self.base_url}/{path}"
+
+    def put(self, review_id, name, review, rating=None):
+        data = {"name": name, "review": review}
+        if rating is not None:
+            data["rating"] = rating
+        response = self.session.put(self._url(f"sentiment/{review_id}"), data)
+        response.raise_for_status()
+        return response.json()
+
+    def get(self, review_id=0):
+        response = self.session.get(self._url(f"sentiment/{review_id}"))
+        response.raise_for_status()
+        return response.json()
+
+    def iter_reviews(self, **filters):
+        """todas las opiniones guardadas, página a página; filters son los
+        parámetros del listado (prediction, since, until, limit)
+        """
+        params = dict(filters)
+        while True:
+            page = self.session.get(self._url("sentiment/0"), params=params)
+            page.raise_for_status()
+            page = page.json()
+            yield from page["reviews"]
+            if page["next"] is None:
+                return
+            params["after"] = page["next"]
+
+    def delete(self, review_id):
+        response = self.session.delete(self._url(f"sentiment/{review_id}"))
+        response.raise_for_status()
+
+    def metrics(self):
+        return self.session.get(self._url("metrics")).json()
+
+    def classify_bulk(self, reviews, chunk_size=500):
+        """clasifica las opiniones de reviews (cualquier iterable de dicts con
+        id, name, review y rating opcional) y devuelve sus resultados a medida
+        que llegan (id, prediction, probability y timestamp, o error), en el
+        mismo orden
+
+        Se suben en NDJSON por tandas de chunk_size opiniones, cada tanda en
+        streaming, así que ni el cliente ni el servidor tienen toda la carga
+        en memoria. requests no lee la respuesta hasta acabar de subir la
+        tanda, y el servidor va respondiendo mientras lee: las tandas tienen
+        que ser pequeñas para que esas respuestas (unos 100 bytes por opinión)
+        quepan en los buffers del socket, o el servidor se queda bloqueado
+        escribiendo y deja de leer la subida.
+        """
+        reviews = iter(reviews)
+        while True:
+            chunk = list(itertools.islice(reviews, chunk_size))
+            if not chunk:
+                return
+            response = self.session.post(
+                self._url("sentiment/bulk"),
+                data=(json.dumps(review).encode() + b"\n" for review in chunk),
+                headers={"Content-Type": "application/x-ndjson"},
+                stream=True,
+            )
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
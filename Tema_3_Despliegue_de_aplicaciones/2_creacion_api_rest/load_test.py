@@ -0,0 +1,70 @@
+"""
+Prueba de carga de la API: lanza muchas peticiones PUT a la vez y mide las
+peticiones por segundo y la latencia.
+
+Para ver lo que ganan los lotes, arranca la API sin ellos y con ellos:
+
+    SENTIMENT_MAX_BATCH=1 python app.py     # y en otra terminal: python load_test.py
+    python app.py                           # y en otra terminal: python load_test.py
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+REVIEWS = [
+    "El sitio es maravilloso",
+    "La comida llegó fría y el camarero fue muy maleducado",
+    "Correcto, sin más. Volvería si me pilla de paso",
+    "The best pizza I have had in years, highly recommended",
+    "Demasiado caro para lo que ofrecen",
+    "Servicio rápido y amable, el postre espectacular",
+]
+
+local = threading.local()
+
+
+def put_review(url, review_id):
+    # una sesión por hilo, para reutilizar la conexión
+    if not hasattr(local, "session"):
+        local.session = requests.Session()
+    start = time.perf_counter()
+    response = local.session.put(
+        f"{url}/sentiment/{review_id}",
+        {"name": "Carga", "review": REVIEWS[review_id % len(REVIEWS)] + f" ({review_id})"},
+    )
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        latencies = list(
+            pool.map(lambda i: put_review(args.url, i), range(1, args.requests + 1))
+        )
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    print(f"{args.requests} peticiones con {args.concurrency} clientes en {elapsed:.2f} s")
+    print(f"{args.requests / elapsed:.1f} peticiones/s")
+    print(
+        "latencia p50 {:.0f} ms, p95 {:.0f} ms, máx {:.0f} ms".format(
+            *np.percentile(latencies, [50, 95, 100])
+        )
+    )
+    metrics = requests.get(f"{args.url}/metrics").json()
+    print("tamaño de lote:", metrics["batch_size"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Caché de predicciones direccionada por contenido.
+
+La clave es un hash del modelo y del texto normalizado (Unicode NFC, espacios
+colapsados, minúsculas: el modelo no distingue mayúsculas), así que una misma
+opinión repetida, o enviada otra vez con otros espacios, no vuelve a pasar por
+el modelo. Hay dos niveles:
+
+- memoria: un LRU de SENTIMENT_CACHE_SIZE predicciones (10000 por defecto)
+- disco: una base SQLite en SENTIMENT_CACHE_DB, opcional, que sobrevive a los
+  reinicios y la comparten todos los procesos
+
+Los textos iguales que llegan mientras el primero aún se está clasificando
+esperan a ese mismo resultado en vez de entrar otra vez en el lote.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+
+CACHE_SIZE = int(os.environ.get("SENTIMENT_CACHE_SIZE", 10000))
+CACHE_DB = os.environ.get("SENTIMENT_CACHE_DB") or None
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class PredictionCache:
+    def __init__(self, model_id, max_items=CACHE_SIZE, path=CACHE_DB):
+        self.model_id = model_id
+        self.max_items = max_items
+        self.path = path
+        self.memory = OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.counts = {"memory_hits": 0, "disk_hits": 0, "coalesced": 0, "misses": 0}
+        # sqlite3 no comparte conexiones entre hilos: una por hilo
+        self.local = threading.local()
+        if path:
+            self._connection().execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                " key TEXT PRIMARY KEY, label TEXT, score REAL, created REAL)"
+            )
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.model_id}\n{normalize(text)}".encode()).hexdigest()
+
+    def _connection(self):
+        if not hasattr(self.local, "connection"):
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self.local.connection = connection
+        return self.local.connection
+
+    def _remember(self, key, result):
+        """guarda result en el LRU; llamar con self.lock"""
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_items:
+            self.memory.popitem(last=False)
+
+    def get(self, text):
+        """la predicción guardada de text, o None"""
+        key = self.key(text)
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.counts["memory_hits"] += 1
+                return self.memory[key]
+        if self.path:
+            row = self._connection().execute(
+                "SELECT label, score FROM predictions WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                result = {"label": row[0], "score": row[1]}
+                with self.lock:
+                    self._remember(key, result)
+                    self.counts["disk_hits"] += 1
+                return result
+        return None
+
+    def put(self, text, result):
+        key = self.key(text)
+        with self.lock:
+            self._remember(key, result)
+        if self.path:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                (key, result["label"], result["score"], time.time()),
+            )
+
+    def get_or_submit(self, text, submit):
+        """Future con la predicción de text: ya resuelto si estaba guardada, el
+        de la petición en curso si el mismo texto se está clasificando, o el
+        de submit(text), cuyo resultado se guarda al terminar
+        """
+        result = self.get(text)
+        if result is not None:
+            future = Future()
+            future.set_result(result)
+            return future
+
+        key = self.key(text)
+        with self.lock:
+            if key in self.in_flight:
+                self.counts["coalesced"] += 1
+                return self.in_flight[key]
+            self.counts["misses"] += 1
+            future = submit(text)
+            self.in_flight[key] = future
+
+        def done(future):
+            if future.exception() is None:
+                self.put(text, future.result())
+            with self.lock:
+                del self.in_flight[key]
+
+        future.add_done_callback(done)
+        return future
+
+    def metrics(self):
+        with self.lock:
+            counts = dict(self.counts)
+            size = len(self.memory)
+        lookups = sum(counts.values())
+        hits = counts["memory_hits"] + counts["disk_hits"] + counts["coalesced"]
+        return {
+            **counts,
+            "hit_rate": hits / lookups if lookups else None,
+            "memory_items": size,
+            "disk": self.path,
+        }
@@ -0,0 +1,151 @@
+"""
+Almacén de las opiniones en SQLite.
+
+Las opiniones, con su predicción y la fecha en que se clasificaron, se guardan
+en el fichero SENTIMENT_DB (reviews.sqlite junto a app.py por defecto), así
+que se conservan entre reinicios y las ven todos los workers de gunicorn. El
+modo WAL deja leer a la vez que otro proceso escribe.
+
+Los listados se recorren por páginas con un cursor (timestamp, id) en vez de
+con OFFSET, y cada filtro tiene su índice, así que pedir una página cuesta lo
+mismo con mil opiniones que con millones. Todas las consultas son sentencias
+fijas con parámetros, que sqlite3 prepara una vez por conexión y reutiliza.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+DB_PATH = os.environ.get(
+    "SENTIMENT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "reviews.sqlite")
+)
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS reviews (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        review TEXT NOT NULL,
+        rating INTEGER,
+        prediction TEXT,
+        probability REAL,
+        timestamp TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS reviews_timestamp ON reviews (timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS reviews_prediction ON reviews (prediction, timestamp, id)",
+]
+
+SAVE = """
+    INSERT INTO reviews (id, name, review, rating, prediction, probability, timestamp)
+    VALUES (:id, :name, :review, :rating, :prediction, :probability, :timestamp)
+    ON CONFLICT (id) DO UPDATE SET
+        name = excluded.name, review = excluded.review, rating = excluded.rating,
+        prediction = excluded.prediction, probability = excluded.probability,
+        timestamp = excluded.timestamp
+"""
+GET = "SELECT id, name, review, rating, prediction, probability, timestamp FROM reviews WHERE id = ?"
+DELETE = "DELETE FROM reviews WHERE id = ?"
+# Con prediction se usa reviews_prediction y sin ella reviews_timestamp: en
+# ambos casos es un recorrido del índice desde el cursor que se para al llenar
+# la página.
+LIST_BY_PREDICTION = """
+    SELECT id, name, review, rating, prediction, probability, timestamp FROM reviews
+    WHERE prediction = :prediction
+      AND (timestamp, id) > (:after_timestamp, :after_id)
+      AND timestamp < :until
+    ORDER BY timestamp, id LIMIT :limit
+"""
+LIST_ALL = """
+    SELECT id, name, review, rating, prediction, probability, timestamp FROM reviews
+    WHERE (timestamp, id) > (:after_timestamp, :after_id)
+      AND timestamp < :until
+    ORDER BY timestamp, id LIMIT :limit
+"""
+
+
+def review_row(review_id, args, sentiment):
+    """fila de la opinión review_id con los campos de args y la predicción"""
+    return {
+        "id": review_id,
+        "name": args["name"],
+        "review": args["review"],
+        "rating": args.get("rating"),
+        "prediction": sentiment["label"].split()[0],
+        "probability": sentiment["score"],
+        "timestamp": str(datetime.now()),
+    }
+
+
+def encode_cursor(row):
+    return f"{row['timestamp']}|{row['id']}"
+
+
+def decode_cursor(cursor):
+    timestamp, review_id = cursor.rsplit("|", 1)
+    return timestamp, int(review_id)
+
+
+class ReviewStore:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        # sqlite3 no comparte conexiones entre hilos: una por hilo
+        self.local = threading.local()
+        connection = self._connection()
+        with connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+    def _connection(self):
+        if not hasattr(self.local, "connection"):
+            connection = sqlite3.connect(self.path, timeout=10, cached_statements=32)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            # con WAL basta sincronizar en los checkpoints
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return self.local.connection
+
+    def save(self, row):
+        self.save_many([row])
+        return row
+
+    def save_many(self, rows):
+        """guarda (o reemplaza) varias opiniones en una sola transacción"""
+        connection = self._connection()
+        with connection:
+            connection.executemany(SAVE, rows)
+
+    def get(self, review_id):
+        row = self._connection().execute(GET, (review_id,)).fetchone()
+        return dict(row) if row else None
+
+    def delete(self, review_id):
+        """True si la opinión existía"""
+        connection = self._connection()
+        with connection:
+            return connection.execute(DELETE, (review_id,)).rowcount > 0
+
+    def list(self, after=None, limit=PAGE_SIZE, prediction=None, since=None, until=None):
+        """(opiniones, cursor de la página siguiente o None) en orden de
+        clasificación, desde el cursor after, con la predicción prediction y
+        clasificadas entre since (incluida) y until (excluida)
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        after_timestamp, after_id = decode_cursor(after) if after else ("", 0)
+        if since and since > after_timestamp:
+            # since es el cursor justo antes de la primera opinión de since,
+            # así el recorrido del índice empieza ahí
+            after_timestamp, after_id = since, -(2**63)
+        params = {
+            "prediction": prediction,
+            "after_timestamp": after_timestamp,
+            "after_id": after_id,
+            # mayor que cualquier fecha
+            "until": until or "~",
+            "limit": limit,
+        }
+        query = LIST_BY_PREDICTION if prediction is not None else LIST_ALL
+        rows = [dict(row) for row in self._connection().execute(query, params)]
+        cursor = encode_cursor(rows[-1]) if len(rows) == limit else None
+        return rows, cursor
@@ -1,9 +1,15 @@
-import requests
+from client import SentimentClient
 
-BASE = "http://127.0.0.1:5000/"
+api = SentimentClient()
 
-response = requests.put(BASE + "sentiment/1", {"name": "Carlos", "review": "El sitio es maravilloso"})
-print(response.json())
+print(api.put(1, "Carlos", "El sitio es maravilloso"))
 
-response = requests.post(BASE + "sentiment/1")
-print(response.json())
\ No newline at end of file
+# Varias opiniones en una sola petición
+reviews = [
+    {"id": 2, "name": "Lucía", "review": "La comida llegó fría", "rating": 2},
+    {"id": 3, "name": "Pedro", "review": "Volveremos seguro, todo perfecto"},
+]
+for result in api.classify_bulk(reviews):
+    print(result)
+
+print(api.get(1))